@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BookmarkHub.settings')
 
 application = get_asgi_application()
+
+# Only server processes warm the tagger, never migrate, shell or tests.
+from base.tagging import warm_on_startup  # noqa: E402
+
+warm_on_startup()
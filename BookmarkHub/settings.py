@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'base.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,6 +82,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Concurrent saves (threads or ASGI) would otherwise fail with
+        # "database is locked" when a read transaction upgrades to a write.
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -126,6 +133,96 @@ import os
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static"),]
 
+# Tagging (tagger/ai.py)
+# The KeyBERT model is loaded lazily on first use. With TAGGER_WARM_ON_STARTUP
+# each web server process (wsgi.py / asgi.py) loads it in the background as
+# it starts, unless TAGGING_QUEUE_MODE is 'worker'; run_tagging_worker always
+# does. `manage.py warm_tagger` is a deploy step: it downloads the weights
+# into the local model cache so that no process has to fetch them.
+# With TAGGER_POOL_SIZE > 0 tagging runs in that many local worker processes
+# and web processes never hold the model weights.
+
+TAGGER_MODEL_NAME = 'all-mpnet-base-v2'
+TAGGER_WARM_ON_STARTUP = True
+TAGGER_POOL_SIZE = 0
+
+# TAGGER_BACKEND picks where model tags come from (tagger/ai.py):
+# 'keybert':    KeyBERT scores candidate phrases from each text with TAGGER_MODEL_NAME.
+# 'small':      the same with the much smaller TAGGER_SMALL_MODEL_NAME.
+# 'vocabulary': the nearest of SMART_KEYWORDS and existing tag titles, whose
+#               embeddings are kept in TAGGER_VOCABULARY_PATH (tagger/vocabulary.py).
+#               `manage.py warm_tagger` writes the current tag titles to that file ahead of time.
+# 'tfidf':      no model; TF-IDF against the document frequencies in the
+#               DocumentFrequency table (base/term_stats.py). Run
+#               `manage.py rebuild_term_stats` once for existing articles.
+TAGGER_BACKEND = 'keybert'
+TAGGER_SMALL_MODEL_NAME = 'all-MiniLM-L6-v2'
+TAGGER_VOCABULARY_PATH = BASE_DIR / 'tag_vocabulary.npz'
+TAGGER_DOCUMENT_FREQUENCIES = 'base.term_stats.document_frequencies'
+
+# Saving a bookmark queues a TaggingJob instead of tagging inline (base/tagging.py).
+# 'thread': drained by a background thread in the web process.
+# 'worker': drained by `manage.py run_tagging_worker`.
+# 'sync':   tagged inline before the response.
+TAGGING_QUEUE_MODE = 'thread'
+
+# Tags for identical title + overview text are reused from the TagCacheEntry
+# table (base/tag_cache.py). Least recently used entries are evicted past
+# this size; 0 disables the cache.
+TAG_CACHE_MAX_ENTRIES = 10000
+
+# Home feeds are materialized per user as FeedEntry rows (base/feed.py).
+FEED_MAX_ENTRIES = 500
+FEED_PAGE_SIZE = 30
+
+# Weighted interest profiles (base/interests.py): tag weights halve every
+# INTEREST_HALF_LIFE_DAYS, at most INTEREST_MAX_TERMS are kept per user and
+# the feed matches on the FEED_INTEREST_TERMS strongest.
+INTEREST_HALF_LIFE_DAYS = 30
+INTEREST_MAX_TERMS = 50
+FEED_INTEREST_TERMS = 15
+
+# Full-text search for the home ?q= box (base/search.py): 'auto', 'sqlite_fts',
+# 'postgres' or 'like'. 'auto' picks FTS5 on SQLite and tsvector on Postgres.
+SEARCH_BACKEND = 'auto'
+SEARCH_MAX_RESULTS = 500
+
+# Home feed ranking: 'keywords' (tag matching, base/feed.py) or 'embeddings'
+# (nearest articles to the user's profile vector, base/recommend.py). Run
+# `manage.py embed_articles` once before switching to 'embeddings'.
+RECOMMENDER = 'keywords'
+RECOMMEND_SYNC_SECONDS = 30
+# How far back each sync looks past the previous one, for embeddings whose
+# transaction committed after that sync ran.
+RECOMMEND_SYNC_MARGIN_SECONDS = 300
+RECOMMEND_NPROBE = 8
+
+# Per-request profiling (base/profiling.py): Server-Timing headers, a
+# `base.profiling` log line and /metrics/profiling/ for a sample of requests.
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_RATE = 0.1
+
+# Cached board cards and board lists (base/fragments.py). Use a file-based
+# cache to share fragments between worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+FRAGMENT_CACHE_ALIAS = 'default'
+FRAGMENT_CACHE_TIMEOUT = 600
+
+# Sessions are read from SESSION_CACHE_ALIAS and written through to the
+# database, and the logged-in user is cached for USER_CACHE_TIMEOUT seconds
+# (base/user_cache.py; 0 disables it). With several worker processes point
+# both aliases at a shared (file-based) cache, or logouts and profile edits
+# only reach the cache of the process that handled them.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'default'
+AUTHENTICATION_BACKENDS = ['base.user_cache.CachedModelBackend']
+USER_CACHE_ALIAS = 'default'
+USER_CACHE_TIMEOUT = 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
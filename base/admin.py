@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import User, Preference, Article, Board
+from .models import User, Preference, Article, Board, TaggingJob
 
 admin.site.register(User)
 admin.site.register(Preference)
 admin.site.register(Article)
 admin.site.register(Board)
+admin.site.register(TaggingJob)
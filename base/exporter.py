@@ -0,0 +1,115 @@
+"""Streaming export of a user's boards.
+
+Exports are written as JSON Lines, CSV or Netscape bookmark HTML (the format
+browsers import, and base/importer.py reads back). Articles are read board
+by board with `.iterator(chunk_size=...)` and their tags are prefetched one
+chunk at a time, so memory stays flat however many articles a user has
+saved; each format is produced as a generator of text pieces for a
+StreamingHttpResponse or a file.
+"""
+import csv
+import json
+from html import escape
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch
+
+from .models import Preference, Article, Board
+
+CHUNK_SIZE = 1000
+FORMATS = {
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'csv': ('text/csv', 'csv'),
+    'html': ('text/html', 'html'),
+}
+CSV_HEADER = ['board', 'title', 'url', 'description', 'tags', 'saved']
+
+
+def _saved_articles(user, chunk_size):
+    """(board, article, tag titles) for everything `user` saved, board by board."""
+    tags = Prefetch('preferences', queryset=Preference.objects.only('p_id', 'title'))
+    for board in Board.objects.filter(user=user).order_by('b_id'):
+        articles = (
+            Article.objects.filter(boards=board)
+            .only('a_id', 'title', 'overview', 'link', 'created')
+            .prefetch_related(tags)
+            .order_by('a_id')
+        )
+        for article in articles.iterator(chunk_size=chunk_size):
+            yield board, article, sorted(tag.title for tag in article.preferences.all() if tag.title)
+
+
+def export_jsonl(user, chunk_size=CHUNK_SIZE):
+    for board, article, tags in _saved_articles(user, chunk_size):
+        yield json.dumps({
+            'board': board.name,
+            'title': article.title,
+            'url': article.link,
+            'description': article.overview,
+            'tags': tags,
+            'saved': article.created.isoformat(),
+        }) + '\n'
+
+
+class _Echo:
+    # csv.writer target that hands each formatted row back instead of buffering it
+    def write(self, value):
+        return value
+
+
+def export_csv(user, chunk_size=CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for board, article, tags in _saved_articles(user, chunk_size):
+        yield writer.writerow([
+            board.name, article.title, article.link, article.overview, ';'.join(tags),
+            article.created.isoformat(),
+        ])
+
+
+def export_html(user, chunk_size=CHUNK_SIZE):
+    yield (
+        '<!DOCTYPE NETSCAPE-Bookmark-file-1>\n'
+        '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">\n'
+        '<TITLE>Bookmarks</TITLE>\n<H1>Bookmarks</H1>\n<DL><p>\n'
+    )
+    current = None
+    for board, article, tags in _saved_articles(user, chunk_size):
+        if board.pk != current:
+            if current is not None:
+                yield '    </DL><p>\n'
+            current = board.pk
+            yield f'    <DT><H3>{escape(board.name or "")}</H3>\n    <DL><p>\n'
+        line = (
+            f'        <DT><A HREF="{escape(article.link or "")}" '
+            f'ADD_DATE="{int(article.created.timestamp())}" TAGS="{escape(",".join(tags))}">'
+            f'{escape(article.title or "")}</A>\n'
+        )
+        if article.overview:
+            line += f'        <DD>{escape(article.overview)}\n'
+        yield line
+    if current is not None:
+        yield '    </DL><p>\n'
+    yield '</DL><p>\n'
+
+
+EXPORTERS = {'jsonl': export_jsonl, 'csv': export_csv, 'html': export_html}
+
+
+async def _batches(pieces, size=200):
+    # One thread hop per batch of lines rather than per line.
+    def take():
+        return [piece for _, piece in zip(range(size), pieces)]
+
+    while batch := await sync_to_async(take)():
+        yield ''.join(batch)
+
+
+def for_response(request, pieces, batch_size=200):
+    """Adapt a generator of pieces to the server: an async iterator under
+    ASGI and a plain one under WSGI, since Django buffers the other kind
+    whole before sending it."""
+    if isinstance(request, ASGIRequest):
+        return _batches(pieces, batch_size)
+    return pieces
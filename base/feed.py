@@ -0,0 +1,129 @@
+"""Materialized home feeds.
+
+Each user's ranked feed candidates are stored as FeedEntry rows so `home`
+only has to read one indexed, paginated slice. Feeds are rebuilt for a user
+when their preferences change (lazily, on their next visit), and new articles
+are pushed into the feeds of matching users once they have been tagged.
+
+Keywords are the title tokens (base/tokens.py) of the user's strongest
+interests (base/interests.py). An article matches a user when one of its tags
+has a keyword among its tokens; its score sums the keyword weight of every
+matching (tag, token) pair, so tags that share more words with an interest
+rank higher. Tag tokens are kept in the PreferenceToken table and each user's
+keywords in InterestToken, so both candidate articles for a user and the
+users a new article is pushed to are found with an indexed `token IN (...)`.
+
+Users without any interests are not materialized: their home page reads the
+live candidate query, which is every unsaved article, newest first.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from . import interests, user_cache
+from .models import User, Article, FeedEntry, InterestToken, PreferenceToken
+from .tokens import tokenize, weighted_keywords
+
+
+def _max_entries():
+    return getattr(settings, 'FEED_MAX_ENTRIES', 500)
+
+
+def _tag_score(tag_titles, keywords):
+    # Same sum as candidate_articles(), for one article's tags.
+    return sum(keywords.get(token, 0.0) for tag in tag_titles for token in tokenize(tag))
+
+
+def candidate_articles(user):
+    """Live (unmaterialized) feed query for `user`, best matches first."""
+    articles = Article.objects.exclude(boards__user=user)
+
+    keywords = weighted_keywords(interests.interest_titles(interests.strongest(user)))
+    if keywords:
+        whens = [
+            When(token=kw, then=Value(weight))
+            for kw, weight in sorted(keywords.items(), key=lambda item: item[1], reverse=True)
+        ]
+        # The Case compares the token already joined by the filter: written as
+        # When(preferences__tokens__token=...) it would turn the joins into
+        # LEFT OUTER ones, and SQLite would then scan every article instead of
+        # starting from the token index.
+        articles = (
+            articles.filter(preferences__tokens__token__in=list(keywords))
+            .alias(token=F('preferences__tokens__token'))
+            .annotate(score=Sum(Case(*whens, default=Value(0.0), output_field=FloatField())))
+        )
+    else:
+        articles = articles.annotate(score=Value(0.0, output_field=FloatField()))
+    return articles.order_by('-score', '-updated', '-a_id')
+
+
+def refresh_user_feed(user):
+    """Rebuild `user`'s feed from scratch."""
+    entries = [
+        FeedEntry(user=user, article=article, score=article.score, updated=article.updated)
+        for article in candidate_articles(user).only('a_id', 'updated')[:_max_entries()]
+    ]
+
+    with transaction.atomic():
+        FeedEntry.objects.filter(user=user).delete()
+        FeedEntry.objects.bulk_create(entries)
+        user.feed_refreshed = timezone.now()
+        User.objects.filter(pk=user.pk).update(feed_refreshed=user.feed_refreshed)
+    user_cache.forget(user.pk)
+
+
+def ensure_feed(user):
+    if user.feed_refreshed is None:
+        refresh_user_feed(user)
+
+
+def mark_stale(user_ids):
+    """Have these users' feeds rebuilt on their next visit (their interests changed)."""
+    user_ids = list(user_ids)
+    User.objects.filter(pk__in=user_ids).update(feed_refreshed=None)
+    user_cache.forget(*user_ids)
+
+
+def add_article_to_feeds(article):
+    """Push a freshly tagged article into the feed of every user it matches."""
+    # One row per (tag, token), the pairs candidate_articles() sums over.
+    tag_tokens = Counter(
+        PreferenceToken.objects.filter(preference__articles=article).values_list('token', flat=True)
+    )
+    if not tag_tokens:
+        return
+    scores = defaultdict(float)
+    matches = InterestToken.objects.filter(token__in=list(tag_tokens)).values_list('user_id', 'token', 'weight')
+    for user_id, token, weight in matches:
+        scores[user_id] += weight * tag_tokens[token]
+    for user_id in article.boards.values_list('user_id', flat=True):
+        scores.pop(user_id, None)
+    if not scores:
+        return
+
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, article=article, score=score, updated=article.updated)
+            for user_id, score in scores.items()
+        ],
+        ignore_conflicts=True,
+    )
+    _trim(scores)
+
+
+def _trim(user_ids):
+    # Everything past FEED_MAX_ENTRIES in these users' feeds, in one DELETE.
+    ranked = FeedEntry.objects.filter(user_id__in=list(user_ids)).annotate(
+        rank=Window(RowNumber(), partition_by=[F('user_id')], order_by=FeedEntry._meta.ordering)
+    )
+    FeedEntry.objects.filter(pk__in=ranked.filter(rank__gt=_max_entries()).values('pk')).delete()
+
+
+def remove_saved(user, article):
+    """Drop an article the user just saved from their feed."""
+    FeedEntry.objects.filter(user=user, article=article).delete()
@@ -0,0 +1,87 @@
+"""Cached HTML fragments for the public board pages.
+
+`articleList` caches each page of a board's rendered article cards and
+`boardList` caches each user's rendered board list, in the Django cache
+named by FRAGMENT_CACHE_ALIAS.
+
+Invalidation is versioned: every board and user has a version number in the
+cache, and it is part of the fragment keys. Bumping a version (base/signals.py
+does so on saves, board changes and profile edits) makes the old fragments
+unreachable, and they expire after FRAGMENT_CACHE_TIMEOUT. `invalidate_all()`
+bumps a global generation for bulk writes that bypass signals.
+
+Fragments are shared by all viewers, so they are rendered with every "Save
+Article" button wrapped in `<!--save:ID-->...<!--/save-->` markers;
+`overlay_save_buttons()` keeps only the buttons the current viewer may use.
+"""
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+GENERATION_KEY = 'fragment:generation'
+SAVE_BUTTON_RE = re.compile(r'<!--save:(\d+)-->(.*?)<!--/save-->', re.S)
+
+
+def _cache():
+    return caches[getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')]
+
+
+def _version_key(kind, pk):
+    return f'fragment:version:{kind}:{pk}'
+
+
+def _fresh_version():
+    # A version lost to eviction restarts above every version used before it.
+    return int(time.time() * 1000)
+
+
+def _versions(keys):
+    cache = _cache()
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _fresh_version(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def _bump(key):
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _fresh_version(), None)
+
+
+def bump(kind, *pks):
+    """Invalidate the fragments of the given boards ('board') or users ('user')."""
+    for pk in set(pks):
+        _bump(_version_key(kind, pk))
+
+
+def invalidate_all():
+    _bump(GENERATION_KEY)
+
+
+def fragment(kind, pk, part, build):
+    """Return the cached value for (`kind`, `pk`, `part`), calling `build()`
+    to produce it on a miss. `part` tells pages of one fragment apart."""
+    generation, version = _versions([GENERATION_KEY, _version_key(kind, pk)])
+    digest = hashlib.md5(part.encode()).hexdigest()
+    key = f'fragment:{kind}:{pk}:{generation}:{version}:{digest}'
+    cache = _cache()
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 600))
+    return value
+
+
+def overlay_save_buttons(html, saveable_ids):
+    """Keep the save buttons of `saveable_ids` and drop the rest."""
+    return SAVE_BUTTON_RE.sub(
+        lambda m: m.group(2) if int(m.group(1)) in saveable_ids else '', html
+    )
@@ -0,0 +1,172 @@
+"""Bulk bookmark import.
+
+Browser bookmark exports (the Netscape HTML format every browser writes) and
+CSV files are parsed line by line, so an upload is never held in memory
+whole. Bookmarks are written in chunks of `chunk_size`: one query finds the
+links that already exist, one bulk insert creates the rest, one more attaches
+them all to the board, and the chunk is handed to the tagging queue in one
+go. `import_bookmarks` yields running totals after every chunk.
+"""
+import csv
+import io
+from html.parser import HTMLParser
+from itertools import chain, islice
+from urllib.parse import urlsplit
+
+from django.db import transaction
+
+from . import fragments, search, tagging
+from .links import normalize_link
+from .models import Article, FeedEntry
+
+CHUNK_SIZE = 500
+CSV_COLUMNS = {
+    'link': ('url', 'link', 'href', 'uri'),
+    'title': ('title', 'name'),
+    'overview': ('description', 'overview', 'excerpt', 'note', 'notes'),
+}
+
+
+class _BookmarkParser(HTMLParser):
+    # <DT><A HREF="...">Title</A> optionally followed by <DD>Description
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.bookmarks = []
+        self._current = None
+        self._field = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            self._flush()
+            self._current = {'link': dict(attrs).get('href') or '', 'title': '', 'overview': ''}
+            self._field = 'title'
+        elif tag == 'dd' and self._current is not None:
+            self._field = 'overview'
+        elif tag in ('dt', 'h3', 'dl'):
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag == 'a':
+            self._field = None
+        elif tag == 'dl':
+            self._flush()
+
+    def handle_data(self, data):
+        if self._current is not None and self._field:
+            self._current[self._field] += data
+
+    def _flush(self):
+        if self._current is not None:
+            self.bookmarks.append(self._current)
+        self._current = None
+        self._field = None
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def parse_html(lines):
+    parser = _BookmarkParser()
+    for line in lines:
+        parser.feed(line)
+        yield from parser.bookmarks
+        parser.bookmarks.clear()
+    parser.close()
+    yield from parser.bookmarks
+
+
+def parse_csv(lines):
+    reader = csv.DictReader(lines)
+    columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+    mapping = {
+        field: next((columns[alias] for alias in aliases if alias in columns), None)
+        for field, aliases in CSV_COLUMNS.items()
+    }
+    if mapping['link'] is None:
+        raise ValueError("CSV needs a url or link column")
+    for row in reader:
+        yield {field: (row.get(column) or '') if column else '' for field, column in mapping.items()}
+
+
+def parse_bookmarks(fileobj, filename=''):
+    """Bookmarks from an uploaded HTML export or CSV (binary file object)."""
+    lines = io.TextIOWrapper(fileobj, encoding='utf-8-sig', errors='replace', newline='')
+    first = next(lines, '')
+    lines = chain([first], lines)
+    name = filename.lower()
+    if name.endswith('.csv'):
+        return parse_csv(lines)
+    if name.endswith(('.html', '.htm')) or first.lstrip().startswith('<'):
+        return parse_html(lines)
+    return parse_csv(lines)
+
+
+def _clean(row):
+    link = (row.get('link') or '').strip()
+    if not link.lower().startswith(('http://', 'https://')) or len(link) > 500:
+        return None  # javascript:, place:, data: and oversized links
+    try:
+        urlsplit(link).port
+    except ValueError:
+        return None  # malformed port or IPv6 host
+    return Article(
+        title=' '.join((row.get('title') or '').split())[:200] or link[:200],
+        overview=' '.join((row.get('overview') or '').split())[:300],
+        link=link,
+        canonical_link=normalize_link(link),
+    )
+
+
+def _import_chunk(user, board, rows, seen, totals):
+    articles = {}
+    for row in rows:
+        totals['read'] += 1
+        article = _clean(row)
+        if article is None or not article.canonical_link:
+            totals['skipped'] += 1
+        elif article.canonical_link in seen:
+            totals['duplicates'] += 1
+        else:
+            seen.add(article.canonical_link)
+            articles[article.canonical_link] = article
+    if not articles:
+        return
+
+    existing = set(
+        Article.objects.filter(canonical_link__in=articles).values_list('canonical_link', flat=True)
+    )
+    # Ignore conflicts with links saved concurrently; they are picked up below.
+    Article.objects.bulk_create(
+        [article for link, article in articles.items() if link not in existing], ignore_conflicts=True
+    )
+    ids = dict(Article.objects.filter(canonical_link__in=articles).values_list('canonical_link', 'pk'))
+    totals['existing'] += len(existing)
+    totals['created'] += len(ids) - len(existing)
+
+    through = Article.boards.through
+    through.objects.bulk_create(
+        [through(article_id=pk, board_id=board.pk) for pk in ids.values()], ignore_conflicts=True
+    )
+    # Bulk inserts skip the signals that keep these in step.
+    search.get_backend().index([pk for link, pk in ids.items() if link not in existing])
+    fragments.bump('board', board.pk)
+    FeedEntry.objects.filter(user=user, article_id__in=ids.values()).delete()
+    tagging.enqueue_tagging_many(ids.values(), user)
+
+
+def import_bookmarks(user, board, bookmarks, chunk_size=CHUNK_SIZE):
+    """Save `bookmarks` (dicts with link, title and overview) to `board`.
+
+    Yields the running totals (read, created, existing, duplicates, skipped)
+    after each chunk; every chunk is committed on its own.
+    """
+    totals = {'read': 0, 'created': 0, 'existing': 0, 'duplicates': 0, 'skipped': 0}
+    seen = set()
+    bookmarks = iter(bookmarks)
+    while chunk := list(islice(bookmarks, chunk_size)):
+        with transaction.atomic():
+            _import_chunk(user, board, chunk, seen, totals)
+        yield dict(totals)
+    if not totals['read']:
+        yield dict(totals)
@@ -0,0 +1,144 @@
+"""Weighted user-interest profiles.
+
+Instead of collecting every tag of every saved article in `user.preferences`,
+each user keeps a small `interests` map of Preference id -> weight. Saving an
+article adds weight to its tags, the preferences chosen on the select page
+carry SELECTED_WEIGHT while they stay chosen, and all weights decay with a half-life of INTEREST_HALF_LIFE_DAYS. Only
+the INTEREST_MAX_TERMS strongest tags are kept, and the feed only looks at the
+FEED_INTEREST_TERMS strongest of those. The title tokens of those, with their
+weights, are mirrored into InterestToken whenever a profile is written.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import user_cache
+from .models import User, Preference, InterestToken, Article
+from .tokens import weighted_keywords
+
+SAVE_WEIGHT = 1.0
+SELECTED_WEIGHT = 2.0
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _decayed(weights, since, now):
+    if since is None or not weights:
+        return dict(weights)
+    days = (now - since).total_seconds() / 86400
+    factor = 0.5 ** (days / _setting('INTEREST_HALF_LIFE_DAYS', 30))
+    return {p_id: weight * factor for p_id, weight in weights.items()}
+
+
+def _capped(weights):
+    top = sorted(weights.items(), key=lambda item: item[1], reverse=True)
+    return dict(top[:_setting('INTEREST_MAX_TERMS', 50)])
+
+
+def _load(user):
+    # JSON object keys are strings.
+    return {int(p_id): weight for p_id, weight in (user.interests or {}).items()}
+
+
+def _store(user, weights, now):
+    user.interests = {str(p_id): round(weight, 6) for p_id, weight in _capped(weights).items()}
+    user.interests_updated = now
+    User.objects.filter(pk=user.pk).update(interests=user.interests, interests_updated=now)
+    user_cache.forget(user.pk)
+    index_tokens(user)
+
+
+def index_tokens(user):
+    """Rewrite the user's InterestToken rows from their stored profile."""
+    top = sorted(_load(user).items(), key=lambda item: item[1], reverse=True)
+    keywords = weighted_keywords(interest_titles(top[:_setting('FEED_INTEREST_TERMS', 15)]))
+    InterestToken.objects.filter(user_id=user.pk).delete()
+    InterestToken.objects.bulk_create(
+        [InterestToken(user_id=user.pk, token=token, weight=weight) for token, weight in keywords.items()]
+    )
+
+
+def add_interests(user, preference_ids, amount=SAVE_WEIGHT):
+    """Decay the user's profile to now and add `amount` to each given tag."""
+    _adjust(user, {p_id: amount for p_id in set(preference_ids)})
+
+
+def select_interests(user, previous_ids, selected_ids):
+    """Move the SELECTED_WEIGHT of a changed selection: tags no longer chosen
+    lose it, newly chosen ones gain it, and tags chosen again are untouched."""
+    previous_ids, selected_ids = set(previous_ids), set(selected_ids)
+    amounts = {p_id: -SELECTED_WEIGHT for p_id in previous_ids - selected_ids}
+    amounts.update({p_id: SELECTED_WEIGHT for p_id in selected_ids - previous_ids})
+    if amounts:
+        _adjust(user, amounts)
+
+
+def _adjust(user, amounts):
+    now = timezone.now()
+    with transaction.atomic():
+        locked = User.objects.select_for_update().only('interests', 'interests_updated').get(pk=user.pk)
+        weights = _decayed(_load(locked), locked.interests_updated, now)
+        for p_id, amount in amounts.items():
+            weight = weights.get(p_id, 0.0) + amount
+            if weight > 0:
+                weights[p_id] = weight
+            else:
+                weights.pop(p_id, None)
+        _store(user, weights, now)
+
+
+def rebuild(user):
+    """Recompute a profile from the user's saved articles and chosen preferences."""
+    now = timezone.now()
+    weights = {}
+    saved = Article.preferences.through.objects.filter(article__boards__user=user).values_list(
+        'preference_id', 'article__created'
+    ).distinct()
+    for p_id, saved_at in saved:
+        decayed = _decayed({p_id: SAVE_WEIGHT}, saved_at, now)[p_id]
+        weights[p_id] = weights.get(p_id, 0.0) + decayed
+    for p_id in user.preferences.values_list('pk', flat=True):
+        weights[p_id] = weights.get(p_id, 0.0) + SELECTED_WEIGHT
+    _store(user, weights, now)
+
+
+def reindex_holders(preference_ids):
+    """Rewrite the InterestToken rows of every user with one of these interests
+    (after a tag is renamed, its tokens change)."""
+    keys = [str(p_id) for p_id in preference_ids]
+    for user in User.objects.filter(interests__has_any_keys=keys).only('interests'):
+        index_tokens(user)
+
+
+def merge_interests(keeper_id, duplicate_ids):
+    """Add the weights of `duplicate_ids` to `keeper_id` in every profile.
+
+    InterestToken rows are left alone: follow with `reindex_holders`.
+    """
+    duplicates = {str(p_id) for p_id in duplicate_ids}
+    users = User.objects.filter(interests__has_any_keys=list(duplicates)).only('interests')
+    for user in users:
+        weights = _load(user)
+        moved = sum(weights.pop(int(p_id), 0.0) for p_id in duplicates)
+        weights[keeper_id] = weights.get(keeper_id, 0.0) + moved
+        # Same decay point, so interests_updated is left alone.
+        user.interests = {str(p_id): round(weight, 6) for p_id, weight in _capped(weights).items()}
+        User.objects.filter(pk=user.pk).update(interests=user.interests)
+        user_cache.forget(user.pk)
+
+
+def strongest(user, n=None):
+    """The user's `n` heaviest interests as (preference id, weight), heaviest first."""
+    if user.interests_updated is None:
+        rebuild(user)
+    n = n or _setting('FEED_INTEREST_TERMS', 15)
+    return sorted(_load(user).items(), key=lambda item: item[1], reverse=True)[:n]
+
+
+def interest_titles(weights):
+    """Map preference titles to weights for the given (id, weight) pairs."""
+    weights = dict(weights)
+    titles = Preference.objects.filter(pk__in=weights).values_list('p_id', 'title')
+    return {title: weights[p_id] for p_id, title in titles if title}
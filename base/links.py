@@ -0,0 +1,34 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+TRACKING_PARAMS = {'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref', 'ref_src'}
+
+
+def normalize_link(url):
+    """Canonical form of an article URL, used to share one Article per page.
+
+    Scheme, "www.", default ports, fragments, trailing slashes, tracking
+    parameters and query parameter order do not make two links different.
+    """
+    url = (url or '').strip()
+    if not url:
+        return None
+    try:
+        parts = urlsplit(url if '//' in url else f'//{url}')
+        port = parts.port
+    except ValueError:
+        # Malformed port or IPv6 host: still save it, just unnormalized.
+        return url.lower()[:500]
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if port and port not in (80, 443):
+        host = f'{host}:{port}'
+    path = parts.path.rstrip('/') or ''
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    ))
+    canonical = host + path
+    if query:
+        canonical += '?' + query
+    return canonical[:500]
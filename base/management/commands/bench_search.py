@@ -0,0 +1,71 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from base import search
+from base.models import Article, Preference
+from base.seed import throwaway_database
+from tagger.ai import SMART_KEYWORDS
+
+WORDS = (
+    "report study guide review analysis future history market launch update "
+    "beginner deep dive explained trends lessons inside building world local"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare home search latency of the full-text index against the icontains scan. "
+        "Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--articles', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            self.run(options)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        keywords = sorted(SMART_KEYWORDS)
+        tags = Preference.objects.bulk_create([Preference(title=kw) for kw in keywords])
+
+        self.stdout.write(f"Seeding {options['articles']} articles...")
+        through = Article.preferences.through
+        for start in range(0, options['articles'], 5000):
+            count = min(5000, options['articles'] - start)
+            articles = Article.objects.bulk_create([
+                Article(
+                    title=' '.join(rng.sample(WORDS, 3) + [rng.choice(keywords)]),
+                    overview=' '.join(rng.choice(WORDS + keywords) for _ in range(30)),
+                    link=f"https://example.com/{start + i}",
+                )
+                for i in range(count)
+            ])
+            through.objects.bulk_create([
+                through(article_id=article.pk, preference_id=tag.pk)
+                for article in articles for tag in rng.sample(tags, 3)
+            ])
+        fts = search.SqliteFtsSearchBackend()
+        fts.setup()
+        fts.rebuild()  # bulk_create skips the signals that keep it in sync
+
+        queries = [rng.choice(keywords + WORDS) for _ in range(options['queries'])]
+        results = {}
+        for name, backend in [('icontains', search.LikeSearchBackend()), ('fts5', fts)]:
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                backend.search(query, 500)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = timings
+            self.stdout.write(
+                f"{name:10} p50 {statistics.median(timings):8.2f} ms   "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms"
+            )
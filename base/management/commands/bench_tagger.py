@@ -0,0 +1,123 @@
+import json
+import os
+import resource
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from base import tagging, term_stats
+from base.models import Article
+from base.seed import throwaway_database
+from tagger import ai
+
+# Lightest first, so each backend's growth in peak RSS is its own.
+DEFAULT_BACKENDS = ['tfidf', 'vocabulary', 'small', 'keybert']
+DEFAULT_CORPUS = os.path.join(os.path.dirname(ai.__file__), 'bench_corpus.jsonl')
+
+
+def model_tags(text, tags):
+    # What the backend contributed, beyond smart keywords and top words.
+    return set(tags) - set(ai.match_smart_keywords(text)) - set(ai.extract_top_words(text))
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Tag a fixed corpus with each tagger backend and report tags/sec, memory and "
+        "agreement with the KeyBERT baseline. Runs against a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', nargs='+', choices=list(ai.BACKENDS), default=DEFAULT_BACKENDS)
+        parser.add_argument('--corpus', default=DEFAULT_CORPUS,
+                            help="JSON Lines file of {title, overview} documents.")
+        parser.add_argument('--existing', action='store_true',
+                            help="Tag articles from the current database instead of the corpus file.")
+        parser.add_argument('--limit', type=int, default=500, help="Articles to tag with --existing.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed passes over the documents.")
+        parser.add_argument('--batch-size', type=int, default=ai.DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        # In-process only, so memory is measured where the model lives.
+        with override_settings(TAGGER_POOL_SIZE=0):
+            if options['existing']:
+                docs = list(Article.objects.order_by('a_id').values_list('title', 'overview')[:options['limit']])
+                report = self.run(docs, options)
+            else:
+                with open(options['corpus'], encoding='utf-8') as f:
+                    docs = [(row['title'], row.get('overview', '')) for row in map(json.loads, f) if row]
+                with throwaway_database():
+                    Article.objects.bulk_create([
+                        Article(title=title, overview=overview, link=f'https://example.com/corpus/{i}')
+                        for i, (title, overview) in enumerate(docs)
+                    ])
+                    term_stats.rebuild()
+                    report = self.run(docs, options)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run(self, docs, options):
+        if not docs:
+            raise CommandError("No documents to tag.")
+        batch_size = options['batch_size']
+        texts = [f"{title or ''} {overview or ''}" for title, overview in docs]
+        report = {'documents': len(docs), 'backends': {}}
+        results = {}
+        for name in options['backends']:
+            rss_before = max_rss_mb()
+            tracemalloc.start()
+            with override_settings(TAGGER_BACKEND=name):
+                start = time.perf_counter()
+                try:
+                    ai.get_backend().warm()
+                except ImportError as exc:
+                    tracemalloc.stop()
+                    self.stderr.write(f"{name:10} skipped: {exc}")
+                    continue
+                tagging.sync_vocabulary()
+                results[name] = ai.extract_tags_batch(docs, batch_size=batch_size)
+                warm_seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for _ in range(options['repeat']):
+                    ai.extract_tags_batch(docs, batch_size=batch_size)
+                elapsed = time.perf_counter() - start
+            python_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            tags = sum(map(len, results[name])) * options['repeat']
+            report['backends'][name] = {
+                'first_pass_s': round(warm_seconds, 2),
+                'docs_per_s': round(len(docs) * options['repeat'] / elapsed, 1),
+                'tags_per_s': round(tags / elapsed, 1),
+                'tags_per_doc': round(sum(map(len, results[name])) / len(docs), 2),
+                'python_peak_mb': round(python_peak / 2**20, 1),
+                'rss_growth_mb': round(max_rss_mb() - rss_before, 1),
+            }
+            entry = report['backends'][name]
+            self.stderr.write(
+                f"{name:10} {entry['tags_per_s']:10.1f} tags/s {entry['docs_per_s']:9.1f} docs/s "
+                f"{entry['rss_growth_mb']:7.1f} MB RSS"
+            )
+
+        reference = 'keybert' if 'keybert' in results else next(iter(results), None)
+        for name in results:
+            if name == reference:
+                continue
+            pairs = list(zip(texts, results[reference], results[name]))
+            report['backends'][name]['agreement'] = {
+                'reference': reference,
+                'all_tags': round(sum(jaccard(set(a), set(b)) for _, a, b in pairs) / len(pairs), 3),
+                'model_tags': round(sum(
+                    jaccard(model_tags(text, a), model_tags(text, b)) for text, a, b in pairs
+                ) / len(pairs), 3),
+            }
+        return report
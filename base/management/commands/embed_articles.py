@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from base import recommend
+from base.models import Article, User
+from tagger import ai
+
+
+class Command(BaseCommand):
+    help = "Store sentence embeddings for articles that lack one, then rebuild user profile vectors."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Re-embed every article (e.g. after a model change).")
+        parser.add_argument('--chunk-size', type=int, default=ai.DEFAULT_BATCH_SIZE * 8)
+
+    def handle(self, *args, **options):
+        articles = Article.objects.order_by('pk').only('a_id', 'title', 'overview')
+        if not options['all']:
+            articles = articles.filter(embedding__isnull=True)
+        total = articles.count()
+        chunk = []
+        done = 0
+        for article in articles.iterator(chunk_size=options['chunk_size']):
+            chunk.append(article)
+            if len(chunk) == options['chunk_size']:
+                recommend.embed_articles(chunk)
+                done += len(chunk)
+                self.stdout.write(f"Embedded {done}/{total}")
+                chunk = []
+        recommend.embed_articles(chunk)
+        done += len(chunk)
+
+        profiles = 0
+        for user in User.objects.filter(boards__articles__isnull=False).distinct().iterator():
+            recommend.update_user_profile(user)
+            profiles += 1
+        self.stdout.write(self.style.SUCCESS(f"Embedded {done} article(s), updated {profiles} profile(s)"))
@@ -0,0 +1,76 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from base import feed
+from base.models import User, Board, Article, FeedEntry, TaggingJob
+from base.seed import seed, throwaway_database
+
+# Lines of a plan that read a whole table rather than an index.
+FULL_SCAN = {
+    'sqlite': re.compile(r'\bSCAN (?!CONSTANT)(\w+)(?!.*\bUSING\b)'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+
+
+def view_queries(user, board, article):
+    """(label, queryset, scan allowed) for the queries behind base/views.py."""
+    page_ids = list(FeedEntry.objects.filter(user=user).values_list('article_id', flat=True)[:30])
+    return [
+        ("login: user by email", User.objects.filter(email=user.email), False),
+        ("profilePage/boardList: user by name", User.objects.filter(name=user.name), False),
+        ("boardList/saveArticle: user's boards", Board.objects.filter(user=user), False),
+        ("boardAddConfirmation: board by name", Board.objects.filter(name=board.name, user=user), False),
+        ("save: article by canonical link", Article.objects.filter(canonical_link=article.canonical_link), False),
+        ("home: feed page", FeedEntry.objects.filter(user=user).select_related('article')[:31], False),
+        ("home: saved ids on page", Article.objects.filter(boards__user=user, pk__in=page_ids).values_list('pk'), False),
+        ("feed rebuild: candidate articles", feed.candidate_articles(user)[:500], False),
+        ("articleList: page", Article.objects.filter(boards=board).distinct().order_by('-updated', '-a_id')[:31], False),
+        ("articleList: board by pk", Board.objects.filter(pk=board.pk), False),
+        ("tagging worker: ready jobs", TaggingJob.objects.filter(
+            status=TaggingJob.PENDING, available_at__lte=timezone.now()).values_list('pk')[:50], False),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database and print the query plan of every query behind "
+        "base/views.py, flagging full table scans."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--articles', type=int, default=5000)
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help="Exit with an error if an indexed query falls back to a full scan.")
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            problems = self.run(options)
+        if problems and options['fail_on_scan']:
+            raise CommandError(f"Full table scans in: {', '.join(problems)}")
+
+    def run(self, options):
+        seed(users=options['users'], articles=options['articles'], log=self.stdout.write)
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+        user = User.objects.filter(boards__articles__isnull=False).first()
+        board = Board.objects.filter(user=user, articles__isnull=False).first()
+        article = board.articles.first()
+        scan_re = FULL_SCAN.get(connection.vendor)
+
+        problems = []
+        for label, queryset, scan_allowed in view_queries(user, board, article):
+            plan = queryset.explain()
+            scans = scan_re.findall(plan) if scan_re else []
+            flagged = scans and not scan_allowed
+            status = self.style.ERROR("FULL SCAN") if flagged else self.style.SUCCESS("ok")
+            self.stdout.write(f"\n== {label} [{status}]")
+            self.stdout.write(plan)
+            if flagged:
+                problems.append(label)
+        return problems
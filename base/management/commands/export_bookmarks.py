@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from base.exporter import CHUNK_SIZE, EXPORTERS
+from base.models import User
+
+
+class Command(BaseCommand):
+    help = "Stream a user's boards and articles as JSON Lines, CSV or Netscape bookmark HTML."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help="Email of the user to export.")
+        parser.add_argument('--format', choices=sorted(EXPORTERS), default='jsonl')
+        parser.add_argument('--output', help="File to write; defaults to stdout.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['user'].lower())
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}")
+
+        pieces = EXPORTERS[options['format']](user, options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as f:
+                f.writelines(pieces)
+        else:
+            for piece in pieces:
+                self.stdout.write(piece, ending='')
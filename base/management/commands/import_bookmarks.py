@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from base.importer import CHUNK_SIZE, import_bookmarks, parse_bookmarks
+from base.models import User, Board
+
+
+class Command(BaseCommand):
+    help = "Import a browser bookmarks export (HTML) or CSV file into one of a user's boards."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help="Email of the importing user.")
+        parser.add_argument('--board', required=True, help="Board name; created if missing.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['user'].lower())
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}")
+        board = Board.objects.filter(user=user, name=options['board']).first()
+        if board is None:
+            board = Board.objects.create(user=user, name=options['board'])
+
+        with open(options['path'], 'rb') as f:
+            try:
+                for totals in import_bookmarks(user, board, parse_bookmarks(f, options['path']), options['chunk_size']):
+                    self.stdout.write(
+                        f"{totals['read']} read: {totals['created']} new, {totals['existing']} already saved, "
+                        f"{totals['duplicates']} duplicate, {totals['skipped']} skipped"
+                    )
+            except ValueError as exc:
+                raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Imported into board '{board.name}'"))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from base.models import Preference, PreferenceToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the PreferenceToken index the home feed matches interests on, for "
+        "preferences created before it existed. Safe to run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--rebuild', action='store_true', help="Drop every token first.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        before = PreferenceToken.objects.count()
+        chunk, done = [], 0
+        with transaction.atomic():
+            if options['rebuild']:
+                PreferenceToken.objects.all().delete()
+                before = 0
+            for preference in Preference.objects.only('p_id', 'title').order_by('p_id').iterator(options['chunk_size']):
+                chunk.append(preference)
+                if len(chunk) == options['chunk_size']:
+                    PreferenceToken.objects.index(chunk)
+                    done += len(chunk)
+                    chunk = []
+            PreferenceToken.objects.index(chunk)
+            done += len(chunk)
+        added = PreferenceToken.objects.count() - before
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {done} preferences ({added} new tokens) in {time.perf_counter() - start:.2f}s"
+        ))
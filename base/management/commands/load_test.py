@@ -0,0 +1,120 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from itertools import count
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent requests at a running server and report throughput and "
+        "latency per concurrency level, e.g. to compare WSGI and ASGI deployments."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Base URL of the server.")
+        parser.add_argument('--email', default='bench0@example.com', help="Login (see seed_bench).")
+        parser.add_argument('--password', default='bench-password')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help="GET path to request (repeatable). Defaults to /home/.")
+        parser.add_argument('--save-board', help="Also POST saves of fresh links to this board.")
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--requests', type=int, default=200, help="Requests per concurrency level.")
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        self.base = options['url'].rstrip('/')
+        self.timeout = options['timeout']
+        self.cookies = {}
+        self.login(options['email'], options['password'])
+
+        requests = [('GET', path, None) for path in options['paths'] or ['/home/']]
+        if options['save_board']:
+            requests.append(('POST', f"/board-add-confirmation/{urllib.parse.quote(options['save_board'])}/", 'save'))
+        self.saves = count()
+
+        report = []
+        for concurrency in options['concurrency']:
+            report.append(self.run_level(requests, concurrency, options['requests']))
+            self.stderr.write(
+                f"concurrency {concurrency:3}: {report[-1]['rps']:8.1f} req/s  "
+                f"p50 {report[-1]['p50_ms']:8.1f} ms  p95 {report[-1]['p95_ms']:8.1f} ms  "
+                f"{report[-1]['errors']} errors"
+            )
+        self.stdout.write(json.dumps({'url': self.base, 'levels': report}, indent=2))
+
+    def open(self, method, path, data=None):
+        headers = {'Cookie': '; '.join(f'{k}={v}' for k, v in self.cookies.items())}
+        body = None
+        if data is not None:
+            data = dict(data, csrfmiddlewaretoken=self.cookies.get('csrftoken', ''))
+            body = urllib.parse.urlencode(data).encode()
+            headers['Referer'] = self.base + path
+        request = urllib.request.Request(self.base + path, data=body, headers=headers, method=method)
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def remember_cookies(self, response):
+        for header in response.headers.get_all('Set-Cookie') or []:
+            self.cookies.update({key: morsel.value for key, morsel in SimpleCookie(header).items()})
+
+    def login(self, email, password):
+        class NoRedirect(urllib.request.HTTPRedirectHandler):
+            def redirect_request(self, *args, **kwargs):
+                return None
+
+        try:
+            self.remember_cookies(self.open('GET', '/login/'))
+            opener = urllib.request.build_opener(NoRedirect)
+            data = urllib.parse.urlencode({
+                'email': email, 'password': password,
+                'csrfmiddlewaretoken': self.cookies.get('csrftoken', ''),
+            }).encode()
+            request = urllib.request.Request(self.base + '/login/', data=data, headers={
+                'Cookie': f"csrftoken={self.cookies.get('csrftoken', '')}", 'Referer': self.base + '/login/',
+            })
+            try:
+                opener.open(request, timeout=self.timeout)
+            except urllib.error.HTTPError as redirect:
+                self.remember_cookies(redirect)
+        except OSError as exc:
+            raise CommandError(f"Could not reach {self.base}: {exc}")
+        if 'sessionid' not in self.cookies:
+            raise CommandError(f"Could not log in as {email}")
+
+    def request(self, spec):
+        method, path, kind = spec
+        data = None
+        if kind == 'save':
+            n = next(self.saves)
+            data = {'title': f'Load test {n}', 'overview': 'A page saved by the load test',
+                    'link': f'https://loadtest.example.com/{time.time_ns()}/{n}', 'pic': ''}
+        start = time.perf_counter()
+        try:
+            with self.open(method, path, data) as response:
+                response.read()
+                ok = response.status < 400
+        except OSError:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    def run_level(self, requests, concurrency, total):
+        specs = [requests[i % len(requests)] for i in range(total)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(self.request, specs))
+        elapsed = time.perf_counter() - start
+        timings = sorted(seconds * 1000 for seconds, ok in results)
+        return {
+            'concurrency': concurrency,
+            'requests': total,
+            'errors': sum(1 for _, ok in results if not ok),
+            'rps': round(total / elapsed, 1),
+            'p50_ms': round(statistics.median(timings), 1),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 1),
+        }
@@ -0,0 +1,73 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from base.links import normalize_link
+from base.models import Article, FeedEntry, TaggingJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge Article rows that point at the same normalized link into one shared "
+        "record, moving their boards and tags onto it, and fill in canonical_link."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        groups = defaultdict(list)
+        for pk, link in Article.objects.filter(canonical_link__isnull=True).values_list('pk', 'link').iterator():
+            canonical = normalize_link(link)
+            if canonical:
+                groups[canonical].append(pk)
+        before = Article.objects.count()
+
+        merged = 0
+        with transaction.atomic():
+            for canonical, ids in groups.items():
+                # Prefer an already canonical row, then the oldest one.
+                keeper = Article.objects.filter(canonical_link=canonical).first()
+                if keeper is None:
+                    keeper = Article.objects.get(pk=min(ids))
+                duplicates = [pk for pk in ids if pk != keeper.pk]
+                if duplicates:
+                    self.merge(keeper, duplicates)
+                    merged += len(duplicates)
+                Article.objects.filter(pk=keeper.pk).update(canonical_link=canonical)
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        after = before - merged
+        verb = "Would merge" if options['dry_run'] else "Merged"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {merged} duplicate article(s) into {len(groups)} link(s): {before} -> {after} rows"
+        ))
+
+    def merge(self, keeper, duplicate_ids):
+        board_links = Article.boards.through.objects.filter(article_id__in=duplicate_ids)
+        tag_links = Article.preferences.through.objects.filter(article_id__in=duplicate_ids)
+        keeper.boards.add(*board_links.values_list('board_id', flat=True))
+        keeper.preferences.add(*tag_links.values_list('preference_id', flat=True))
+
+        # Jobs and feed entries are unique per (article, user): move one per
+        # user onto the keeper and let the rest go with the duplicates.
+        job_users = set(keeper.tagging_jobs.values_list('user_id', flat=True))
+        for job in TaggingJob.objects.filter(article_id__in=duplicate_ids):
+            if job.user_id not in job_users:
+                job_users.add(job.user_id)
+                job.article = keeper
+                job.save(update_fields=['article'])
+
+        saved_by = set(keeper.boards.values_list('user_id', flat=True))
+        FeedEntry.objects.filter(article=keeper, user_id__in=saved_by).delete()
+        feed_users = saved_by | set(keeper.feed_entries.values_list('user_id', flat=True))
+        for entry in FeedEntry.objects.filter(article_id__in=duplicate_ids):
+            if entry.user_id not in feed_users:
+                feed_users.add(entry.user_id)
+                entry.article = keeper
+                entry.save(update_fields=['article'])
+
+        for article in Article.objects.filter(pk__in=duplicate_ids):
+            article.delete()
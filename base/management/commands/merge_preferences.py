@@ -0,0 +1,150 @@
+"""Fold Preference rows that name the same tag.
+
+Upgrading a database whose preferences predate unique titles and canonical
+keys takes three steps, because the migration adds unique constraints that
+existing duplicates would violate:
+
+    python manage.py merge_preferences   # merge on the old schema
+    python manage.py migrate             # add canonical_key and the unique constraints
+    python manage.py merge_preferences   # fill in canonical_key on every row
+
+Without checking first, the command only touches what the original schema had:
+the Preference title column and the article and user link tables (keys are
+computed from `title` in Python). Everything added since (canonical_key,
+user interests, the PreferenceToken and InterestToken tables, the search
+index) is written only once it exists.
+"""
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from base import fragments, interests, search
+from base.models import User, Preference, PreferenceToken, InterestToken
+from tagger.normalize import canonical_key, display_title
+
+BATCH_SIZE = 500
+
+
+def merge_into(keeper_id, duplicate_ids, schema):
+    """Move every article link, user link and interest weight of `duplicate_ids`
+    onto `keeper_id`, then delete the duplicates."""
+    for through, column in [(Preference.articles.through, 'article_id'), (Preference.users.through, 'user_id')]:
+        links = through.objects.filter(preference_id__in=duplicate_ids)
+        through.objects.bulk_create(
+            [through(preference_id=keeper_id, **{column: other}) for other in links.values_list(column, flat=True)],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        links.delete()
+    if schema['interests']:
+        interests.merge_interests(keeper_id, duplicate_ids)
+    if schema['tokens']:
+        PreferenceToken.objects.filter(preference_id__in=duplicate_ids).delete()
+    # A raw delete: the collector would also visit tables the old schema lacks.
+    # Every row that points at a Preference has been moved or deleted above.
+    duplicates = Preference.objects.filter(pk__in=duplicate_ids)
+    duplicates._raw_delete(duplicates.db)
+
+
+def link_counts():
+    return (
+        Preference.objects.count(),
+        Preference.articles.through.objects.count(),
+        Preference.users.through.objects.count(),
+    )
+
+
+def pick_keeper(rows, title):
+    # The row already spelled like the display title, else the oldest.
+    return min(rows, key=lambda row: (row[1] != title, row[0]))
+
+
+def has_table(model):
+    return model._meta.db_table in connection.introspection.table_names()
+
+
+def has_column(model, column):
+    with connection.cursor() as cursor:
+        description = connection.introspection.get_table_description(cursor, model._meta.db_table)
+    return any(field.name == column for field in description)
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge Preference rows whose titles normalize to the same canonical key "
+        "('AI' / 'ai' / 'artificial intelligence', 'games' / 'gaming') and fill in "
+        "canonical_key on existing rows. Run it before and after migrating an old database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        schema = {
+            'keys': has_column(Preference, 'canonical_key'),
+            'interests': has_column(User, 'interests'),
+            'tokens': has_table(PreferenceToken),
+            'interest_tokens': has_table(InterestToken),
+            'search': backend.exists(),
+        }
+
+        before = link_counts()
+        groups = defaultdict(list)
+        for p_id, title in Preference.objects.order_by('p_id').values_list('p_id', 'title').iterator():
+            key = canonical_key(title)[:200]
+            if key:
+                groups[key].append((p_id, title))
+
+        merged = 0
+        changed = []
+        with transaction.atomic():
+            for key, rows in groups.items():
+                title = display_title(rows[0][1])[:200]
+                keeper_id, keeper_title = pick_keeper(rows, title)
+                duplicate_ids = [p_id for p_id, _ in rows if p_id != keeper_id]
+                if duplicate_ids:
+                    merge_into(keeper_id, duplicate_ids, schema)
+                    merged += len(duplicate_ids)
+                if duplicate_ids or keeper_title != title:
+                    changed.append(keeper_id)
+                if keeper_title != title:
+                    Preference.objects.filter(pk=keeper_id).update(title=title)
+                    if schema['tokens']:
+                        PreferenceToken.objects.filter(preference_id=keeper_id).delete()
+                        PreferenceToken.objects.index([Preference(pk=keeper_id, title=title)])
+            if schema['search']:
+                for start in range(0, len(changed), BATCH_SIZE):
+                    backend.index(
+                        Preference.articles.through.objects.filter(preference_id__in=changed[start:start + BATCH_SIZE])
+                        .values_list('article_id', flat=True).distinct()
+                    )
+            if schema['keys']:
+                self.fill_keys(groups)
+            if schema['interest_tokens']:
+                interests.reindex_holders(changed)
+            after = link_counts()
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        if merged and not options['dry_run']:
+            fragments.invalidate_all()
+        verb = "Would merge" if options['dry_run'] else "Merged"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {merged} duplicate preference(s) into {len(groups)} canonical tag(s):\n"
+            f"  preferences:       {before[0]} -> {after[0]} rows\n"
+            f"  article tags:      {before[1]} -> {after[1]} rows\n"
+            f"  user preferences:  {before[2]} -> {after[2]} rows"
+        ))
+        if not schema['keys']:
+            self.stdout.write("canonical_key does not exist yet: run `migrate`, then this command again.")
+
+    def fill_keys(self, groups):
+        keys = {p_id: key for key, rows in groups.items() for p_id, _ in rows}
+        stale = [
+            Preference(pk=p_id, canonical_key=keys.get(p_id))
+            for p_id, stored in Preference.objects.values_list('p_id', 'canonical_key').iterator()
+            if stored != keys.get(p_id)
+        ]
+        Preference.objects.bulk_update(stale, ['canonical_key'], batch_size=BATCH_SIZE)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from base import feed
+from base.models import User
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized home feed of every user (or only the given emails)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('emails', nargs='*')
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+        count = 0
+        for user in users.iterator():
+            feed.refresh_user_feed(user)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} feed(s)"))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from base import feed, interests
+from base.models import User
+
+
+class Command(BaseCommand):
+    help = "Recompute every user's weighted interest profile from their saves and chosen preferences."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-feeds', action='store_true', help="Skip rebuilding home feeds afterwards.")
+        parser.add_argument('--tokens-only', action='store_true',
+                            help="Keep the profiles and only rewrite their InterestToken rows (after upgrading).")
+
+    def handle(self, *args, **options):
+        count = 0
+        if options['tokens_only']:
+            for user in User.objects.only('u_id', 'interests').iterator():
+                interests.index_tokens(user)
+                count += 1
+            self.stdout.write(self.style.SUCCESS(f"Indexed the interests of {count} user(s)"))
+            return
+        for user in User.objects.iterator():
+            interests.rebuild(user)
+            if not options['no_feeds']:
+                feed.refresh_user_feed(user)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} interest profile(s)"))
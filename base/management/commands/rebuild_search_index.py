@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from base import search
+
+
+class Command(BaseCommand):
+    help = "Create the full-text search index if needed and refill it from every Article."
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        backend.setup()
+        backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search index ({type(backend).__name__})"))
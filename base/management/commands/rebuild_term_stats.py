@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from base import term_stats
+
+
+class Command(BaseCommand):
+    help = "Recount the document frequencies the 'tfidf' tagger backend ranks words by."
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        total = term_stats.rebuild()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Counted {total} articles in {elapsed:.2f}s"))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from base import interests, tag_cache
+from base.models import Article, Preference, User
+from tagger import ai
+
+
+class Command(BaseCommand):
+    help = "Re-tag every Article with batched model calls (e.g. after a model or threshold change)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help="Articles read from the DB per chunk.")
+        parser.add_argument('--batch-size', type=int, default=ai.DEFAULT_BATCH_SIZE, help="Documents per model call.")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        total = Article.objects.count()
+        done = 0
+        chunk = []
+        for article in Article.objects.order_by('pk').iterator(chunk_size=chunk_size):
+            chunk.append(article)
+            if len(chunk) == chunk_size:
+                done += self.retag(chunk, options['batch_size'])
+                self.stdout.write(f"Retagged {done}/{total}")
+                chunk = []
+        if chunk:
+            done += self.retag(chunk, options['batch_size'])
+
+        # Interest profiles point at tag ids, so rebuild them from the new tags.
+        for user in User.objects.filter(boards__articles__isnull=False).distinct().iterator():
+            interests.rebuild(user)
+        self.stdout.write(self.style.SUCCESS(f"Retagged {done} article(s)"))
+
+    def retag(self, articles, batch_size):
+        all_tags = tag_cache.extract_tags_batch(
+            [(article.title, article.overview) for article in articles],
+            batch_size=batch_size,
+        )
+        with transaction.atomic():
+            for article, tags in zip(articles, all_tags):
+                preferences = Preference.objects.get_or_create_many(tags)
+                article.preferences.set(preferences)
+        return len(articles)
@@ -0,0 +1,141 @@
+import json
+import statistics
+import time
+import tracemalloc
+from itertools import count
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from base.models import User, Board
+from base.seed import seed, throwaway_database
+from tagger import ai
+
+
+def stub_extract_tags_batch(docs, batch_size=ai.DEFAULT_BATCH_SIZE):
+    # No model in benchmarks: only the cheap, deterministic parts of extract_tags.
+    return [
+        list(set(ai.match_smart_keywords(f"{title} {overview}") + ai.extract_top_words(f"{title} {overview}")))
+        for title, overview in docs
+    ]
+
+
+def percentile(sorted_values, pct):
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the main views through the test client and report p50/p95 latency, "
+        "query counts and peak memory as JSON, optionally checked against a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--existing', action='store_true',
+                            help="Use the current database (see seed_bench) instead of a seeded throwaway one.")
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--articles', type=int, default=2000)
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--output', help="Write the JSON report to this file.")
+        parser.add_argument('--baseline', help="JSON report to compare against.")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Allowed p95 slowdown over the baseline (0.25 = 25%%).")
+
+    def handle(self, *args, **options):
+        # Tagging is left to the (absent) worker so saves measure only the request path.
+        with override_settings(TAGGING_QUEUE_MODE='worker', ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), \
+                mock.patch('tagger.ai.extract_tags_batch', stub_extract_tags_batch):
+            if options['existing']:
+                report = self.run(options)
+            else:
+                with throwaway_database():
+                    seed(users=options['users'], articles=options['articles'], log=self.stderr.write)
+                    report = self.run(options)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = self.compare(report, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError("Performance regressions:\n" + "\n".join(regressions))
+
+    def scenarios(self, user, board):
+        query = ai.match_smart_keywords(' '.join(board.articles.values_list('overview', flat=True)[:5])) or ['report']
+        saves = count()
+        return {
+            'home': lambda c: c.get(reverse('home')),
+            'home_search': lambda c: c.get(reverse('home'), {'q': query[0]}),
+            'home_cards': lambda c: c.get(reverse('home-cards')),
+            'article_list': lambda c: c.get(reverse('article-list', args=[board.pk])),
+            'board_list': lambda c: c.get(reverse('board-list', args=[user.name])),
+            'profile_page': lambda c: c.get(reverse('profile', args=[user.name])),
+            'save_article': lambda c: c.post(reverse('board-add-confirmation', args=[board.name]), {
+                'title': 'Benchmark save', 'overview': 'A saved page about climate change',
+                'link': f'https://bench.example.com/{next(saves)}', 'pic': '',
+            }),
+        }
+
+    def run(self, options):
+        user = User.objects.filter(boards__articles__isnull=False).order_by('pk').first()
+        if user is None:
+            raise CommandError("No user with saved articles; run seed_bench first or drop --existing.")
+        board = Board.objects.filter(user=user, articles__isnull=False).first()
+        client = Client()
+        client.force_login(user)
+
+        results = {}
+        for name, request in self.scenarios(user, board).items():
+            request(client)  # warm-up (also builds the materialized feed)
+            timings, queries = [], []
+            for _ in range(options['iterations']):
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    response = request(client)
+                    timings.append((time.perf_counter() - start) * 1000)
+                queries.append(len(ctx.captured_queries))
+                if response.status_code >= 400:
+                    raise CommandError(f"{name} returned {response.status_code}")
+
+            # Memory in a separate pass so tracing does not skew the timings.
+            tracemalloc.start()
+            request(client)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            timings.sort()
+            results[name] = {
+                'p50_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+                'queries': max(queries),
+                'peak_kb': round(peak / 1024, 1),
+            }
+            self.stderr.write(f"{name:14} p50 {results[name]['p50_ms']:8.2f} ms  "
+                              f"p95 {results[name]['p95_ms']:8.2f} ms  {results[name]['queries']:3} queries")
+        return {
+            'meta': {'vendor': connection.vendor, 'iterations': options['iterations']},
+            'scenarios': results,
+        }
+
+    def compare(self, report, baseline, tolerance):
+        regressions = []
+        for name, base in baseline.get('scenarios', {}).items():
+            current = report['scenarios'].get(name)
+            if current is None:
+                continue
+            if current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{name}: p95 {base['p95_ms']} -> {current['p95_ms']} ms")
+            if current['queries'] > base['queries']:
+                regressions.append(f"{name}: queries {base['queries']} -> {current['queries']}")
+        return regressions
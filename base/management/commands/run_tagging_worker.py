@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from base import tagging
+from tagger import ai
+
+
+class Command(BaseCommand):
+    help = "Drain the tagging queue, tagging saved articles in the background."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty.")
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+
+    def handle(self, *args, **options):
+        ai.warm()
+        while True:
+            requeued = tagging.requeue_stale()
+            if requeued:
+                self.stdout.write(f"Requeued {requeued} stale job(s)")
+            processed = tagging.run_pending(options['batch_size'])
+            if processed:
+                self.stdout.write(f"Tagged {processed} article(s)")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
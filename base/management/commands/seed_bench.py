@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from base.seed import seed
+
+
+class Command(BaseCommand):
+    help = "Fill the database with synthetic users, boards, articles and tags for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--boards-per-user', type=int, default=3)
+        parser.add_argument('--articles', type=int, default=2000)
+        parser.add_argument('--saves-per-user', type=int, default=20)
+        parser.add_argument('--tags-per-article', type=int, default=5)
+        parser.add_argument('--no-feeds', action='store_true', help="Skip materializing home feeds.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+
+    def handle(self, *args, **options):
+        seed(
+            users=options['users'],
+            boards_per_user=options['boards_per_user'],
+            articles=options['articles'],
+            saves_per_user=options['saves_per_user'],
+            tags_per_article=options['tags_per_article'],
+            feeds=not options['no_feeds'],
+            random_seed=options['seed'],
+            log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS("Seeded benchmark data"))
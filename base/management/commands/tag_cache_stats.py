@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from base import tag_cache
+
+
+class Command(BaseCommand):
+    help = "Show tag cache size, hit rate and evictions across all processes, optionally clearing it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help="Delete every cached entry.")
+        parser.add_argument('--reset', action='store_true', help="Start the hit/miss/eviction counters again.")
+        parser.add_argument('--json', action='store_true', help="Print the stats as JSON, for monitoring.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            tag_cache.clear()
+            self.stdout.write(self.style.SUCCESS("Tag cache cleared"))
+            return
+        stats = tag_cache.stats()
+        if options['reset']:
+            tag_cache.reset_stats()
+        if options['json']:
+            self.stdout.write(json.dumps(stats))
+            return
+        hit_rate = 'n/a' if stats['hit_rate'] is None else f"{stats['hit_rate']:.1%}"
+        self.stdout.write(f"Entries:     {stats['entries']}")
+        self.stdout.write(f"Stored hits: {stats['stored_hits']}")
+        self.stdout.write(f"Since {stats['since']}:")
+        self.stdout.write(f"  Hits:      {stats['hits']}")
+        self.stdout.write(f"  Misses:    {stats['misses']}")
+        self.stdout.write(f"  Hit rate:  {hit_rate}")
+        self.stdout.write(f"  Evictions: {stats['evictions']}")
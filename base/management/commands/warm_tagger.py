@@ -0,0 +1,30 @@
+"""Prime the tagger's on-disk caches, as a deploy or image-build step.
+
+Loading the backend here downloads the model weights into the local model
+cache and, with the 'vocabulary' backend, writes any missing tag titles to
+the vocabulary file. It warms nothing else: this process exits right after.
+Server processes load the backend themselves at startup (TAGGER_WARM_ON_STARTUP)
+and run_tagging_worker on start, from those caches.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from tagger import ai
+from base import tagging
+
+
+class Command(BaseCommand):
+    help = (
+        "Download the tagger model into the local cache ahead of deploying. "
+        "With the 'vocabulary' backend this also embeds any tag titles missing from the vocabulary file."
+    )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        ai.warm()
+        added = tagging.sync_vocabulary()
+        elapsed = time.perf_counter() - start
+        if ai.get_backend().name == 'vocabulary':
+            self.stdout.write(f"{len(ai.get_vocabulary())} vocabulary terms ({added} new)")
+        self.stdout.write(self.style.SUCCESS(f"Tagger caches primed in {elapsed:.2f}s"))
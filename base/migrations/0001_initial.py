@@ -0,0 +1,216 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentFrequency',
+            fields=[
+                ('d_id', models.AutoField(primary_key=True, serialize=False)),
+                ('term', models.CharField(max_length=100, unique=True)),
+                ('documents', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TagCacheEntry',
+            fields=[
+                ('c_id', models.AutoField(primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('fingerprint', models.CharField(max_length=200)),
+                ('tags', models.JSONField(default=list)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('last_used', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-last_used'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TagCacheStats',
+            fields=[
+                ('s_id', models.AutoField(primary_key=True, serialize=False)),
+                ('hits', models.PositiveBigIntegerField(default=0)),
+                ('misses', models.PositiveBigIntegerField(default=0)),
+                ('evictions', models.PositiveBigIntegerField(default=0)),
+                ('since', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('first_name', models.CharField(blank=True, max_length=150, verbose_name='first name')),
+                ('last_name', models.CharField(blank=True, max_length=150, verbose_name='last name')),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('u_id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(blank=True, db_index=True, max_length=200, null=True)),
+                ('email', models.EmailField(max_length=254, null=True, unique=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('pfp', models.ImageField(default='avatar.svg', null=True, upload_to='')),
+                ('feed_refreshed', models.DateTimeField(blank=True, null=True)),
+                ('profile_embedding', models.BinaryField(blank=True, null=True)),
+                ('interests', models.JSONField(blank=True, default=dict, editable=False)),
+                ('interests_updated', models.DateTimeField(blank=True, null=True)),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions')),
+            ],
+            options={
+                'verbose_name': 'user',
+                'verbose_name_plural': 'users',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Board',
+            fields=[
+                ('b_id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='boards', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-updated', '-created'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Article',
+            fields=[
+                ('a_id', models.AutoField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200, null=True)),
+                ('pic', models.URLField(blank=True, max_length=500, null=True)),
+                ('overview', models.CharField(max_length=300, null=True)),
+                ('link', models.URLField(blank=True, max_length=500, null=True)),
+                ('canonical_link', models.CharField(blank=True, editable=False, max_length=500, null=True, unique=True)),
+                ('tags_pending', models.BooleanField(default=False)),
+                ('embedding', models.BinaryField(blank=True, null=True)),
+                ('embedded', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('boards', models.ManyToManyField(blank=True, related_name='articles', to='base.board')),
+            ],
+            options={
+                'ordering': ['-updated', '-created'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('f_id', models.AutoField(primary_key=True, serialize=False)),
+                ('score', models.FloatField(default=0)),
+                ('updated', models.DateTimeField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='base.article')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-score', '-updated', '-article_id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='InterestToken',
+            fields=[
+                ('i_id', models.AutoField(primary_key=True, serialize=False)),
+                ('token', models.CharField(max_length=100)),
+                ('weight', models.FloatField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interest_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Preference',
+            fields=[
+                ('p_id', models.AutoField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200, null=True, unique=True)),
+                ('canonical_key', models.CharField(max_length=200, null=True, unique=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('users', models.ManyToManyField(blank=True, related_name='preferences', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-updated', '-created'],
+            },
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='preferences',
+            field=models.ManyToManyField(blank=True, related_name='articles', to='base.preference'),
+        ),
+        migrations.CreateModel(
+            name='PreferenceToken',
+            fields=[
+                ('t_id', models.AutoField(primary_key=True, serialize=False)),
+                ('token', models.CharField(max_length=100)),
+                ('preference', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='base.preference')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TaggingJob',
+            fields=[
+                ('j_id', models.AutoField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('rerun', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tagging_jobs', to='base.article')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tagging_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['available_at', 'j_id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='board',
+            index=models.Index(fields=['user', 'name'], name='board_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='board',
+            index=models.Index(fields=['user', '-updated', '-created'], name='board_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-score', '-updated', '-article'], name='feedentry_rank_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'article'), name='unique_feed_entry'),
+        ),
+        migrations.AddConstraint(
+            model_name='interesttoken',
+            constraint=models.UniqueConstraint(fields=('token', 'user'), name='unique_interest_token'),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['-updated', '-a_id'], name='article_recent_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='preferencetoken',
+            constraint=models.UniqueConstraint(fields=('token', 'preference'), name='unique_preference_token'),
+        ),
+        migrations.AddIndex(
+            model_name='taggingjob',
+            index=models.Index(fields=['status', 'available_at'], name='taggingjob_queue_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='taggingjob',
+            constraint=models.UniqueConstraint(fields=('article', 'user'), name='unique_tagging_job'),
+        ),
+    ]
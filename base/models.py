@@ -1,8 +1,13 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 
 from django.contrib.auth.base_user import BaseUserManager
 
+from tagger.normalize import canonical_key, display_title
+from .links import normalize_link
+from .tokens import tokenize
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -30,30 +35,120 @@ class CustomUserManager(BaseUserManager):
 class User(AbstractUser):
     username = None
     u_id = models.AutoField(primary_key=True)
-    name =  models.CharField(max_length=200, null=True, blank=True)
+    name =  models.CharField(max_length=200, null=True, blank=True, db_index=True)
     email = models.EmailField(unique=True, null=True)
     description = models.TextField(null=True, blank=True)
 
     pfp = models.ImageField(null=True, default="avatar.svg")
+    feed_refreshed = models.DateTimeField(null=True, blank=True)
+    profile_embedding = models.BinaryField(null=True, blank=True, editable=False)
+    # Preference id -> decayed weight, capped to the strongest terms (base/interests.py)
+    interests = models.JSONField(default=dict, blank=True, editable=False)
+    interests_updated = models.DateTimeField(null=True, blank=True)
     
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['name']
 
     objects = CustomUserManager()
 
+class PreferenceManager(models.Manager):
+    def get_or_create_many(self, titles):
+        """Resolve tag titles to Preference rows with one insert and one select.
+
+        Titles are resolved by canonical key (tagger/normalize.py), so 'AI',
+        'ai' and 'artificial intelligence' all give the same row.
+        Concurrent callers are safe: the unique key makes losing inserts no-ops.
+        """
+        wanted = {}
+        for title in titles:
+            key = canonical_key(title)[:200]
+            if key:
+                wanted.setdefault(key, display_title(title)[:200])
+        if not wanted:
+            return []
+        self.bulk_create(
+            [self.model(title=title, canonical_key=key) for key, title in wanted.items()], ignore_conflicts=True
+        )
+        preferences = list(self.filter(canonical_key__in=wanted))
+        found = {preference.canonical_key for preference in preferences}
+        missing = [title for key, title in wanted.items() if key not in found]
+        if missing:
+            # Rows saved before canonical keys existed (see merge_preferences).
+            preferences += self.filter(canonical_key__isnull=True, title__in=missing)
+        PreferenceToken.objects.index(preferences)
+        return preferences
+
+
 class Preference(models.Model):
     p_id = models.AutoField(primary_key=True)
-    title = models.CharField(max_length=200, null=True)
+    title = models.CharField(max_length=200, null=True, unique=True)
+    canonical_key = models.CharField(max_length=200, null=True, unique=True)
     users = models.ManyToManyField(User, related_name='preferences', blank=True)
     created = models.DateTimeField(auto_now_add=True)  
     updated = models.DateTimeField(auto_now=True)
 
+    objects = PreferenceManager()
+
     class Meta:
         ordering = ['-updated', '-created']
 
     def __str__(self):
         return self.title
-    
+
+    def save(self, *args, **kwargs):
+        self.canonical_key = canonical_key(self.title)[:200] or None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'title' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'canonical_key'}
+        super().save(*args, **kwargs)
+
+
+class PreferenceTokenManager(models.Manager):
+    def index(self, preferences):
+        """Add the title tokens of `preferences` in one insert (existing ones are kept)."""
+        self.bulk_create(
+            [self.model(token=token, preference_id=p.pk) for p in preferences for token in tokenize(p.title)],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+
+
+class PreferenceToken(models.Model):
+    # Inverted index of tag title tokens, so feeds match interests with an
+    # indexed `token IN (...)` instead of a LIKE '%kw%' per keyword.
+    t_id = models.AutoField(primary_key=True)
+    token = models.CharField(max_length=100)
+    preference = models.ForeignKey(Preference, on_delete=models.CASCADE, related_name='tokens')
+
+    objects = PreferenceTokenManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['token', 'preference'], name='unique_preference_token'),
+        ]
+
+    def __str__(self):
+        return f"{self.token} -> {self.preference_id}"
+
+
+class InterestToken(models.Model):
+    # The feed keywords of each user (the tokens of their FEED_INTEREST_TERMS
+    # strongest interests, base/interests.py), so a newly tagged article
+    # finds the feeds it belongs in with an indexed `token IN (...)`.
+    i_id = models.AutoField(primary_key=True)
+    token = models.CharField(max_length=100)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='interest_tokens')
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['token', 'user'], name='unique_interest_token'),
+        ]
+
+    def __str__(self):
+        return f"{self.token} -> {self.user_id}"
+
+
 class Board(models.Model):
     b_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=200, null=True)
@@ -63,6 +158,12 @@ class Board(models.Model):
 
     class Meta:
         ordering = ['-updated', '-created']
+        indexes = [
+            # Board.objects.get(name=..., user=...) when saving to a board
+            models.Index(fields=['user', 'name'], name='board_user_name_idx'),
+            # a user's boards, newest first (boardList, saveArticle)
+            models.Index(fields=['user', '-updated', '-created'], name='board_user_recent_idx'),
+        ]
 
     def __str__(self):
         return self.name or "Unnamed Board"
@@ -75,12 +176,121 @@ class Article(models.Model):
     overview = models.CharField(max_length=300, null=True)
     boards = models.ManyToManyField(Board, related_name='articles', blank=True)
     link = models.URLField(max_length=500, null=True, blank=True)
+    # One shared Article per page: saves only add a board (see base/links.py)
+    canonical_link = models.CharField(max_length=500, unique=True, null=True, blank=True, editable=False)
+    tags_pending = models.BooleanField(default=False)
+    # Unit-length float32 sentence embedding, see base/recommend.py
+    embedding = models.BinaryField(null=True, blank=True, editable=False)
+    embedded = models.DateTimeField(null=True, blank=True, db_index=True)
     created = models.DateTimeField(auto_now_add=True)  
     updated = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-updated', '-created']
+        indexes = [
+            # keyset pages on (updated, a_id) and the default ordering
+            models.Index(fields=['-updated', '-a_id'], name='article_recent_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        self.canonical_link = normalize_link(self.link)
+        super().save(*args, **kwargs)
     
+
+class TaggingJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    j_id = models.AutoField(primary_key=True)
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='tagging_jobs')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tagging_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    available_at = models.DateTimeField(default=timezone.now)
+    # Re-saved while running: queue it again once that run finishes.
+    rerun = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['available_at', 'j_id']
+        constraints = [
+            models.UniqueConstraint(fields=['article', 'user'], name='unique_tagging_job'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='taggingjob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.article} ({self.status})"
+
+
+class TagCacheEntry(models.Model):
+    c_id = models.AutoField(primary_key=True)
+    key = models.CharField(max_length=64, unique=True)
+    fingerprint = models.CharField(max_length=200)
+    tags = models.JSONField(default=list)
+    hits = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['-last_used']
+
+    def __str__(self):
+        return self.key
+
+
+class TagCacheStats(models.Model):
+    # Hit, miss and eviction counts of the tag cache, shared by every process
+    # (one row, see base/tag_cache.py).
+    s_id = models.AutoField(primary_key=True)
+    hits = models.PositiveBigIntegerField(default=0)
+    misses = models.PositiveBigIntegerField(default=0)
+    evictions = models.PositiveBigIntegerField(default=0)
+    since = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.hits} hits / {self.misses} misses since {self.since}"
+
+
+class DocumentFrequency(models.Model):
+    # How many tagged articles contain `term`, for the 'tfidf' tagger backend.
+    d_id = models.AutoField(primary_key=True)
+    term = models.CharField(max_length=100, unique=True)
+    documents = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.term} ({self.documents})"
+
+
+class FeedEntry(models.Model):
+    f_id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feed_entries')
+    article = models.ForeignKey(Article, on_delete=models.CASCADE, related_name='feed_entries')
+    score = models.FloatField(default=0)
+    updated = models.DateTimeField()  # copy of article.updated, for ordering
+
+    class Meta:
+        ordering = ['-score', '-updated', '-article_id']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'article'], name='unique_feed_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score', '-updated', '-article'], name='feedentry_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} -> {self.article}"
@@ -0,0 +1,87 @@
+"""Keyset (cursor) pagination.
+
+Pages are fetched with `WHERE (a, b, c) < (last a, last b, last c)` on an
+indexed, fully descending ordering instead of OFFSET, so every page costs the
+same however deep the user scrolls. Cursors are opaque url-safe strings.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(values):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, length):
+    """Raises ValueError for anything that is not a cursor we produced.
+
+    A well-formed cursor can still hold a value of the wrong type for its
+    field (a number for a timestamp); that raises TypeError, ValueError or
+    ValidationError once the page is queried.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Invalid cursor")
+    # Only the numbers, ISO timestamps and ids encode_cursor writes.
+    if any(isinstance(v, bool) or not isinstance(v, (int, float, str)) for v in values):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _after(fields, values):
+    # (f1 < v1) OR (f1 = v1 AND f2 < v2) OR ... for a descending ordering
+    q = Q()
+    for i, field in enumerate(fields):
+        clause = Q(**{f'{field}__lt': values[i]})
+        for prev_field, prev_value in zip(fields[:i], values):
+            clause &= Q(**{prev_field: prev_value})
+        q |= clause
+    return q
+
+
+def keyset_page(queryset, fields, cursor=None, size=30):
+    """Return `(items, next_cursor)` for the page after `cursor`.
+
+    `fields` are the attribute names the page is ordered by, all descending;
+    the last one must be unique. `next_cursor` is None on the last page.
+    """
+    queryset = _keyset_queryset(queryset, fields, cursor)
+    return _split_page(list(queryset[:size + 1]), fields, size)
+
+
+async def akeyset_page(queryset, fields, cursor=None, size=30):
+    """Async version of `keyset_page`."""
+    queryset = _keyset_queryset(queryset, fields, cursor)
+    return _split_page([item async for item in queryset[:size + 1]], fields, size)
+
+
+def _keyset_queryset(queryset, fields, cursor):
+    queryset = queryset.order_by(*[f'-{field}' for field in fields])
+    if cursor:
+        queryset = queryset.filter(_after(fields, decode_cursor(cursor, len(fields))))
+    return queryset
+
+
+def _split_page(items, fields, size):
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        next_cursor = encode_cursor([getattr(items[-1], field) for field in fields])
+    return items, next_cursor
+
+
+def list_page(items, cursor=None, size=30):
+    """Page through an already ranked, bounded list; the cursor is a position."""
+    start = decode_cursor(cursor, 1)[0] if cursor else 0
+    if not isinstance(start, int) or start < 0:
+        raise ValueError("Invalid cursor")
+    end = start + size
+    next_cursor = encode_cursor([end]) if end < len(items) else None
+    return items[start:end], next_cursor
@@ -0,0 +1,221 @@
+"""Opt-in per-request profiling.
+
+With PROFILING_ENABLED, ProfilingMiddleware times a sample of requests
+(PROFILING_SAMPLE_RATE, 0..1) and splits their wall time into:
+
+- db: time inside SQL queries (with the query count),
+- template: time rendering templates,
+- tagger: time inside the tagger.ai entry points (model loading, tagging,
+  embedding),
+- app: everything else, i.e. the view's own Python code.
+
+Sampled responses get a `Server-Timing` header, so the split shows up in the
+browser's network panel. Each sampled request is logged to the
+`base.profiling` logger, and per-view aggregates are served as JSON by
+`profilingMetrics` to staff users, along with the tag cache counters.
+Requests that are not sampled only pay for one random number. When
+profiling is disabled the middleware removes itself at startup.
+
+Timings live in a context variable, so they follow a request into
+`sync_to_async` threads and work the same for sync and async views.
+"""
+import contextvars
+import functools
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+
+from . import tag_cache
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ('db', 'template', 'tagger')
+TAGGER_FUNCTIONS = ('get_model', 'extract_tags', 'extract_tags_batch', 'embed_documents')
+
+_current = contextvars.ContextVar('profiling_timings', default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Timings:
+    def __init__(self):
+        self.seconds = dict.fromkeys(SECTIONS, 0.0)
+        self.queries = 0
+        self._active = set()
+
+
+def _timed(section, func):
+    """Wrap `func` so its run time counts towards `section` of the current
+    request. Nested calls of the same section are only counted once."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _current.get()
+        if timings is None or section in timings._active:
+            return func(*args, **kwargs)
+        timings._active.add(section)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.seconds[section] += time.perf_counter() - start
+            timings._active.discard(section)
+    return wrapper
+
+
+def _counted(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _current.get()
+        if timings is not None:
+            timings.queries += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install():
+    """Wrap query execution, template rendering and the tagger entry points
+    (once per process)."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from django.db.backends.utils import CursorWrapper
+        from django.template.base import Template
+        from tagger import ai
+
+        for name in ('_execute', '_executemany'):
+            setattr(CursorWrapper, name, _counted(_timed('db', getattr(CursorWrapper, name))))
+        Template.render = _timed('template', Template.render)
+        for name in TAGGER_FUNCTIONS:
+            setattr(ai, name, _timed('tagger', getattr(ai, name)))
+        _installed = True
+
+
+class Metrics:
+    """Per-view aggregates of sampled requests."""
+
+    def __init__(self, window=200):
+        self.window = window
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view, total, timings):
+        with self.lock:
+            stats = self.views.get(view)
+            if stats is None:
+                stats = self.views[view] = {
+                    'count': 0, 'queries': 0,
+                    'seconds': dict.fromkeys(('total',) + SECTIONS, 0.0),
+                    'recent': deque(maxlen=self.window),
+                }
+            stats['count'] += 1
+            stats['queries'] += timings.queries
+            stats['seconds']['total'] += total
+            for section in SECTIONS:
+                stats['seconds'][section] += timings.seconds[section]
+            stats['recent'].append(total)
+
+    def snapshot(self):
+        with self.lock:
+            result = {}
+            for view, stats in self.views.items():
+                count = stats['count']
+                recent = sorted(stats['recent'])
+                result[view] = {
+                    'count': count,
+                    'avg_queries': round(stats['queries'] / count, 2),
+                    'avg_ms': {k: round(v / count * 1000, 3) for k, v in stats['seconds'].items()},
+                    'p50_ms': round(recent[len(recent) // 2] * 1000, 3),
+                    'p95_ms': round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 3),
+                }
+            return result
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+metrics = Metrics()
+
+
+def server_timing(total, timings):
+    app = total - sum(timings.seconds.values())
+    parts = [f'total;dur={total * 1000:.1f}']
+    parts.append(f'db;dur={timings.seconds["db"] * 1000:.1f};desc="{timings.queries} queries"')
+    parts += [f'{section};dur={timings.seconds[section] * 1000:.1f}' for section in SECTIONS[1:]]
+    parts.append(f'app;dur={max(app, 0.0) * 1000:.1f}')
+    return ', '.join(parts)
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not _setting('PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = _setting('PROFILING_SAMPLE_RATE', 0.1)
+        install()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        timings, token, start = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, start)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+        timings, token, start = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, timings, start)
+
+    def _start(self):
+        timings = Timings()
+        return timings, _current.set(timings), time.perf_counter()
+
+    def _finish(self, request, response, timings, start):
+        total = time.perf_counter() - start
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else request.path
+        metrics.record(view, total, timings)
+        header = server_timing(total, timings)
+        response['Server-Timing'] = header
+        logger.info("%s %s %s", request.method, view, header)
+        return response
+
+
+@staff_member_required
+def profilingMetrics(request):
+    return JsonResponse({
+        'enabled': _setting('PROFILING_ENABLED', False),
+        'sample_rate': _setting('PROFILING_SAMPLE_RATE', 0.1),
+        'views': metrics.snapshot(),
+        'tag_cache': tag_cache.stats(),
+    })
@@ -0,0 +1,258 @@
+"""Semantic recommendations from sentence embeddings.
+
+Every tagged Article stores the embedding of its title + overview as a
+float32 blob, and each user has a profile vector: the normalized mean of the
+embeddings of the articles they saved. `recommend()` returns the articles
+closest to that profile from an in-process vector index.
+
+The index is an inverted-file (IVF) index: vectors are grouped around
+k-means centroids and a query only scores the vectors in its `nprobe`
+nearest groups. Below `min_train_size` vectors it simply scores everything.
+It is loaded from the database on first use and then topped up with newly
+embedded articles, so it is never rebuilt from scratch on the request path.
+Once it has doubled since the last k-means run, a background thread trains
+new centroids on a snapshot and swaps them in; queries keep using the old
+ones (or exact search) meanwhile. Deleted articles are removed from it by
+base/signals.py.
+"""
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from tagger import ai
+from . import user_cache
+from .models import Article, User
+
+DTYPE = np.float32
+
+
+def to_blob(vector):
+    return np.asarray(vector, dtype=DTYPE).tobytes()
+
+
+def from_blob(blob):
+    return np.frombuffer(bytes(blob), dtype=DTYPE)
+
+
+def _normalize(vector):
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class VectorIndex:
+    def __init__(self, nprobe=8, min_train_size=2000, seed=0):
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.rng = np.random.default_rng(seed)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.vectors = None
+        self.rows = {}
+        self.centroids = None
+        self.clusters = np.empty(0, dtype=np.int64)
+        self.trained_size = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, ids, vectors):
+        vectors = np.asarray(vectors, dtype=DTYPE)
+        if self.vectors is None:
+            self.vectors = np.empty((0, vectors.shape[1]), dtype=DTYPE)
+        new_ids, new_vectors = [], []
+        for article_id, vector in zip(ids, vectors):
+            row = self.rows.get(article_id)
+            if row is None:
+                new_ids.append(article_id)
+                new_vectors.append(vector)
+            elif not np.array_equal(self.vectors[row], vector):
+                self.vectors[row] = vector
+                if self.centroids is not None:
+                    self.clusters[row] = self._assign(vector[None, :])[0]
+        if new_ids:
+            start = len(self.ids)
+            new_vectors = np.vstack(new_vectors)
+            self.ids = np.concatenate([self.ids, np.asarray(new_ids, dtype=np.int64)])
+            self.vectors = np.vstack([self.vectors, new_vectors])
+            self.rows.update({article_id: start + i for i, article_id in enumerate(new_ids)})
+            if self.centroids is not None:
+                self.clusters = np.concatenate([self.clusters, self._assign(new_vectors)])
+
+    def remove(self, ids):
+        for article_id in ids:
+            row = self.rows.pop(article_id, None)
+            if row is not None:
+                self.ids[row] = -1
+                self.vectors[row] = 0
+
+    def _assign(self, vectors):
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def needs_training(self):
+        """True once the index has doubled since the last training."""
+        n = len(self.ids)
+        return n >= self.min_train_size and n >= 2 * self.trained_size
+
+    def fit(self, vectors, iterations=10):
+        """Spherical k-means over `vectors`; returns (centroids, clusters).
+
+        Reads nothing else from the index, so it can run on a snapshot
+        without holding the index lock.
+        """
+        n = len(vectors)
+        nlist = max(1, int(np.sqrt(n)))
+        centroids = vectors[self.rng.choice(n, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            clusters = np.argmax(vectors @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = vectors[clusters == c]
+                if len(members):
+                    centroids[c] = _normalize(members.sum(axis=0))
+        return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+    def install(self, centroids, clusters, snapshot=None):
+        """Switch to centroids fitted on `snapshot`, the first len(clusters)
+        rows; rows added since, or changed since (re-embedded or removed),
+        are assigned to them here."""
+        n = len(clusters)
+        added = self.vectors[n:]
+        if snapshot is not None:
+            changed = np.flatnonzero((self.vectors[:n] != snapshot).any(axis=1))
+            if len(changed):
+                clusters = clusters.copy()
+                clusters[changed] = np.argmax(self.vectors[changed] @ centroids.T, axis=1)
+        self.centroids = centroids
+        self.clusters = np.concatenate([clusters, self._assign(added)]) if len(added) else clusters
+        self.trained_size = n
+
+    def train(self, iterations=10):
+        self.install(*self.fit(self.vectors, iterations))
+
+    def search(self, query, k, exclude=()):
+        if not self.rows:
+            return []
+        query = np.asarray(query, dtype=DTYPE)
+        if self.centroids is None:
+            candidates = np.arange(len(self.ids))
+        else:
+            nearest = np.argsort(self.centroids @ query)[::-1][:self.nprobe]
+            candidates = np.flatnonzero(np.isin(self.clusters, nearest))
+        if exclude:
+            keep = ~np.isin(self.ids[candidates], np.fromiter(exclude, dtype=np.int64))
+            candidates = candidates[keep]
+        candidates = candidates[self.ids[candidates] >= 0]
+        if not len(candidates):
+            return []
+        scores = self.vectors[candidates] @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [int(article_id) for article_id in self.ids[candidates[top]]]
+
+
+_index = None
+_index_synced = None
+_index_checked = 0.0
+_index_lock = threading.Lock()
+_trainer = None
+
+
+def _start_training(index):
+    # Called with _index_lock held. add() and remove() write rows in place,
+    # so the thread trains on a copy and install() reassigns whatever changed.
+    global _trainer
+    if _trainer is not None and _trainer.is_alive():
+        return
+    snapshot = index.vectors.copy()
+
+    def train():
+        fitted = index.fit(snapshot)
+        with _index_lock:
+            if _index is index:
+                index.install(*fitted, snapshot=snapshot)
+
+    _trainer = threading.Thread(target=train, name='vector-index-training', daemon=True)
+    _trainer.start()
+
+
+def get_index():
+    """The process-wide index, topped up with articles embedded since the
+    last sync (at most every RECOMMEND_SYNC_SECONDS)."""
+    global _index, _index_synced, _index_checked
+    with _index_lock:
+        interval = getattr(settings, 'RECOMMEND_SYNC_SECONDS', 30)
+        if _index is not None and time.monotonic() - _index_checked < interval:
+            return _index
+        if _index is None:
+            _index = VectorIndex(nprobe=getattr(settings, 'RECOMMEND_NPROBE', 8))
+        now = timezone.now()
+        articles = Article.objects.filter(embedding__isnull=False)
+        if _index_synced is not None:
+            # `embedded` is set before its transaction commits, so look back
+            # far enough to catch rows committed after the previous sync.
+            margin = timedelta(seconds=getattr(settings, 'RECOMMEND_SYNC_MARGIN_SECONDS', 300))
+            articles = articles.filter(embedded__gte=_index_synced - margin)
+        ids, vectors = [], []
+        for pk, blob in articles.values_list('pk', 'embedding').iterator(chunk_size=2000):
+            ids.append(pk)
+            vectors.append(from_blob(blob))
+        if ids:
+            _index.add(ids, np.vstack(vectors))
+        if _index.needs_training():
+            _start_training(_index)
+        _index_synced = now
+        _index_checked = time.monotonic()
+        return _index
+
+
+def remove_from_index(article_ids):
+    """Drop deleted articles from this process's index."""
+    with _index_lock:
+        if _index is not None:
+            _index.remove(article_ids)
+
+
+def reset_index():
+    global _index, _index_synced, _index_checked
+    with _index_lock:
+        _index, _index_synced, _index_checked = None, None, 0.0
+
+
+def embed_articles(articles):
+    """Compute and store embeddings for `articles` in one batched model call."""
+    articles = list(articles)
+    if not articles:
+        return
+    vectors = ai.embed_documents([f"{a.title or ''} {a.overview or ''}" for a in articles])
+    now = timezone.now()
+    for article, vector in zip(articles, vectors):
+        article.embedding = to_blob(vector)
+        article.embedded = now
+    Article.objects.bulk_update(articles, ['embedding', 'embedded'])
+
+
+def update_user_profile(user):
+    blobs = Article.objects.filter(
+        boards__user=user, embedding__isnull=False
+    ).distinct().values_list('embedding', flat=True)
+    vectors = [from_blob(blob) for blob in blobs]
+    profile = to_blob(_normalize(np.mean(vectors, axis=0))) if vectors else None
+    user.profile_embedding = profile
+    User.objects.filter(pk=user.pk).update(profile_embedding=profile)
+    user_cache.forget(user.pk)
+
+
+def recommend(user, k):
+    """Ids of the `k` unsaved articles closest to the user's profile, best first,
+    or None when the user has no profile yet."""
+    if not user.profile_embedding:
+        return None
+    saved = set(Article.objects.filter(boards__user=user).values_list('pk', flat=True))
+    return get_index().search(from_blob(user.profile_embedding), k, exclude=saved)
+
+
+def enabled():
+    return getattr(settings, 'RECOMMENDER', 'keywords') == 'embeddings'
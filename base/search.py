@@ -0,0 +1,174 @@
+"""Full-text search over Article title, overview and tag names.
+
+The backend is picked by the SEARCH_BACKEND setting ('auto' chooses by
+database vendor):
+
+* 'sqlite_fts' - an FTS5 virtual table keyed by article id, kept in sync by
+  the signal handlers in base/signals.py and ranked with bm25.
+* 'postgres'   - tsvector / tsquery ranking via django.contrib.postgres.
+* 'like'       - the old unindexed icontains scan, ranked by recency.
+
+Every backend answers `search(query, limit)` with article ids, best first.
+Queries match word prefixes, so "mach learn" finds "machine learning".
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import Article, Preference
+
+WORD_RE = re.compile(r"\w+")
+
+
+def _words(query):
+    return WORD_RE.findall((query or '').lower())
+
+
+class LikeSearchBackend:
+    def exists(self):
+        return True
+
+    def setup(self):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def index(self, article_ids):
+        pass
+
+    def remove(self, article_ids):
+        pass
+
+    def search(self, query, limit):
+        return list(
+            Article.objects.filter(
+                Q(preferences__title__icontains=query) |
+                Q(title__icontains=query) |
+                Q(overview__icontains=query)
+            )
+            .distinct()
+            .order_by('-updated', '-a_id')
+            .values_list('pk', flat=True)[:limit]
+        )
+
+
+class SqliteFtsSearchBackend(LikeSearchBackend):
+    table = 'base_article_fts'
+    # bm25 column weights: title, overview, tags
+    weights = (10.0, 2.0, 5.0)
+
+    def _select_rows(self, where=''):
+        through = Article.preferences.through._meta.db_table
+        return f"""
+            SELECT a.a_id, COALESCE(a.title, ''), COALESCE(a.overview, ''),
+                   COALESCE((SELECT group_concat(p.title, ' ')
+                             FROM {Preference._meta.db_table} p
+                             JOIN {through} ap ON ap.preference_id = p.p_id
+                             WHERE ap.article_id = a.a_id), '')
+            FROM {Article._meta.db_table} a {where}
+        """
+
+    def exists(self):
+        return self.table in connection.introspection.table_names()
+
+    def setup(self):
+        if self.exists():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {self.table} USING fts5("
+                f"title, overview, tags, tokenize='unicode61 remove_diacritics 2')"
+            )
+        self.rebuild()
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(f"INSERT INTO {self.table} (rowid, title, overview, tags) {self._select_rows()}")
+
+    def index(self, article_ids):
+        article_ids = list(article_ids)
+        if not article_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(article_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", article_ids)
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, overview, tags) "
+                f"{self._select_rows(f'WHERE a.a_id IN ({placeholders})')}",
+                article_ids,
+            )
+
+    def remove(self, article_ids):
+        article_ids = list(article_ids)
+        if not article_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(article_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", article_ids)
+
+    def search(self, query, limit):
+        words = _words(query)
+        if not words:
+            return []
+        # Each word is quoted (no FTS syntax injection) and prefix-matched.
+        match = ' AND '.join('"%s"*' % w.replace('"', '""') for w in words)
+        weights = ', '.join(str(w) for w in self.weights)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s "
+                f"ORDER BY bm25({self.table}, {weights}) LIMIT %s",
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend(LikeSearchBackend):
+    # For large tables add a GIN index on the same to_tsvector expression.
+
+    def search(self, query, limit):
+        from django.contrib.postgres.aggregates import StringAgg
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        words = _words(query)
+        if not words:
+            return []
+        search_query = SearchQuery(' & '.join(f'{w}:*' for w in words), search_type='raw')
+        vector = (
+            SearchVector('title', weight='A')
+            + SearchVector(StringAgg('preferences__title', ' ', default=''), weight='B')
+            + SearchVector('overview', weight='C')
+        )
+        return list(
+            Article.objects.annotate(rank=SearchRank(vector, search_query))
+            .filter(rank__gt=0)
+            .order_by('-rank', '-a_id')
+            .values_list('pk', flat=True)[:limit]
+        )
+
+
+BACKENDS = {
+    'like': LikeSearchBackend,
+    'sqlite_fts': SqliteFtsSearchBackend,
+    'postgres': PostgresSearchBackend,
+}
+
+
+def get_backend():
+    name = getattr(settings, 'SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = {'sqlite': 'sqlite_fts', 'postgresql': 'postgres'}.get(connection.vendor, 'like')
+    return BACKENDS[name]()
+
+
+def search_article_ids(query, limit=None):
+    limit = limit or getattr(settings, 'SEARCH_MAX_RESULTS', 500)
+    return get_backend().search(query, limit)
+
+
+def setup_search_index(**kwargs):
+    """post_migrate hook: create (and fill) the index if the backend needs one."""
+    get_backend().setup()
@@ -0,0 +1,107 @@
+"""Synthetic data for benchmarks and query-plan checks.
+
+Tags and saves follow a Zipf-like distribution, so a few topics and articles
+are very popular and most are rare, roughly like real bookmarking data.
+Everything is written with bulk inserts, so the derived data that signals
+normally maintain (search index, interests, feeds, cached fragments) is
+rebuilt at the end.
+"""
+import random
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+
+from tagger.ai import SMART_KEYWORDS
+from . import feed, fragments, interests, search
+from .links import normalize_link
+from .models import User, Preference, Board, Article
+
+WORDS = (
+    "report study guide review analysis future history market launch update "
+    "beginner deep dive explained trends lessons inside building world local "
+    "new why how best first open small big fast quiet modern"
+).split()
+
+
+@contextmanager
+def throwaway_database():
+    """Run the block against a fresh, migrated test database."""
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def _zipf_weights(n, s=1.1):
+    return [1 / (rank + 1) ** s for rank in range(n)]
+
+
+def seed(users=50, boards_per_user=3, articles=2000, saves_per_user=20,
+         tags_per_article=5, feeds=True, random_seed=0, log=None):
+    rng = random.Random(random_seed)
+    log = log or (lambda message: None)
+
+    keywords = sorted(SMART_KEYWORDS)
+    rng.shuffle(keywords)
+    tags = Preference.objects.get_or_create_many(keywords)
+    tag_weights = _zipf_weights(len(tags))
+
+    password = make_password('bench-password')
+    first = User.objects.count()
+    user_objs = User.objects.bulk_create([
+        User(email=f'bench{first + i}@example.com', name=f'bench{first + i}', password=password)
+        for i in range(users)
+    ])
+    board_objs = Board.objects.bulk_create([
+        Board(name=f'board {b}', user=user) for user in user_objs for b in range(boards_per_user)
+    ])
+    log(f"Created {len(user_objs)} users and {len(board_objs)} boards")
+
+    article_objs = []
+    through = Article.preferences.through
+    for start in range(0, articles, 2000):
+        batch = []
+        for i in range(start, min(start + 2000, articles)):
+            link = f'https://example.com/article/{first}-{i}'
+            batch.append(Article(
+                title=' '.join(rng.sample(WORDS, 4)).capitalize(),
+                overview=' '.join(rng.choice(WORDS + keywords[:50]) for _ in range(35)),
+                link=link,
+                canonical_link=normalize_link(link),
+            ))
+        batch = Article.objects.bulk_create(batch)
+        through.objects.bulk_create([
+            through(article_id=article.pk, preference_id=tag.pk)
+            for article in batch
+            for tag in set(rng.choices(tags, weights=tag_weights, k=tags_per_article))
+        ], ignore_conflicts=True)
+        article_objs += batch
+        log(f"Created {len(article_objs)}/{articles} articles")
+
+    boards_by_user = {}
+    for board in board_objs:
+        boards_by_user.setdefault(board.user_id, []).append(board)
+    article_weights = _zipf_weights(len(article_objs), s=0.8)
+    board_links = Article.boards.through
+    links = []
+    for user in user_objs:
+        for article in set(rng.choices(article_objs, weights=article_weights, k=saves_per_user)):
+            links.append(board_links(article_id=article.pk, board_id=rng.choice(boards_by_user[user.pk]).pk))
+    board_links.objects.bulk_create(links, ignore_conflicts=True)
+    log(f"Saved {len(links)} articles to boards")
+
+    for user in user_objs:
+        user.preferences.add(*rng.sample(tags[:30], 3))
+
+    search.get_backend().rebuild()
+    fragments.invalidate_all()
+    for user in user_objs:
+        interests.rebuild(user)
+        if feeds:
+            feed.refresh_user_feed(user)
+    log("Rebuilt search index, interests" + (" and feeds" if feeds else ""))
+
+    return {'users': user_objs, 'boards': board_objs, 'articles': article_objs}
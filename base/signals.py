@@ -0,0 +1,102 @@
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import fragments, interests, recommend, search, user_cache
+from .models import User, Preference, PreferenceToken, Article, Board
+
+
+# Keep the full-text search index (and the recommender's vector index) in
+# step with articles and their tags.
+
+@receiver(post_save, sender=Article)
+def index_article(sender, instance, **kwargs):
+    search.get_backend().index([instance.pk])
+
+
+@receiver(post_delete, sender=Article)
+def unindex_article(sender, instance, **kwargs):
+    search.get_backend().remove([instance.pk])
+    recommend.remove_from_index([instance.pk])
+
+
+@receiver(m2m_changed, sender=Article.preferences.through)
+def reindex_article_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            search.get_backend().index([instance.pk])
+        return
+    # Changed from the Preference side: pk_set holds article ids.
+    if action == 'pre_clear':
+        instance._cleared_article_ids = list(instance.articles.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        search.get_backend().index(getattr(instance, '_cleared_article_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        search.get_backend().index(pk_set)
+
+
+# Keep the token index of tag titles in step with single saves; bulk
+# creation goes through Preference.objects.get_or_create_many, which indexes.
+
+@receiver(post_save, sender=Preference)
+def index_preference_tokens(sender, instance, created, **kwargs):
+    if not created:
+        PreferenceToken.objects.filter(preference=instance).delete()
+    PreferenceToken.objects.index([instance])
+    if not created:
+        interests.reindex_holders([instance.pk])
+        # The search index stores tag titles with each article.
+        search.get_backend().index(instance.articles.values_list('pk', flat=True))
+
+
+# Bump the versions of cached board and user fragments (see base/fragments.py).
+
+@receiver(post_save, sender=Article)
+def refresh_article_cards(sender, instance, created, **kwargs):
+    if not created:
+        fragments.bump('board', *instance.boards.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Article)
+def drop_article_cards(sender, instance, **kwargs):
+    fragments.bump('board', *instance.boards.values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=Article.boards.through)
+def refresh_board_cards(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # Changed from the Board side
+        if action.startswith('post_'):
+            fragments.bump('board', instance.pk)
+    elif action == 'pre_clear':
+        fragments.bump('board', *instance.boards.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        fragments.bump('board', *pk_set)
+
+
+@receiver(post_save, sender=Board)
+@receiver(post_delete, sender=Board)
+def refresh_board_list(sender, instance, **kwargs):
+    fragments.bump('board', instance.pk)
+    fragments.bump('user', instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def refresh_profile_fragments(sender, instance, update_fields=None, **kwargs):
+    # Logging in only touches last_login.
+    if update_fields is None or set(update_fields) - {'last_login'}:
+        fragments.bump('user', instance.pk)
+
+
+# Drop cached logged-in users (see base/user_cache.py).
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    user_cache.forget(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        user_cache.forget(user.pk)
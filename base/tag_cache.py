@@ -0,0 +1,139 @@
+"""Persistent cache of extracted tags, keyed by the content being tagged.
+
+Identical title + overview text (after case and whitespace normalisation)
+always produces the same tags, so duplicate bookmarks are answered from the
+TagCacheEntry table instead of running KeyBERT again. Keys include
+`ai.config_fingerprint()`, so changing the model or thresholds invalidates
+every entry. The table holds about TAG_CACHE_MAX_ENTRIES rows; the least
+recently used ones are evicted first.
+
+Eviction does not count the table on every store: each process keeps an
+estimate of its size and only counts (and evicts down to 90% of the limit)
+when the estimate passes the limit or is older than RECOUNT_AFTER. Entries
+of an old fingerprint are dropped when a process first stores under a new
+one. Hits, misses and evictions are added up in the TagCacheStats row, so
+`manage.py tag_cache_stats` and /metrics/profiling/ report them for all
+processes.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from tagger import ai
+from .models import TagCacheEntry, TagCacheStats
+
+RECOUNT_AFTER = 300  # seconds
+
+# This process's view of the table, see _evict().
+_table = {'fingerprint': None, 'estimate': None, 'counted_at': 0.0}
+_table_lock = threading.Lock()
+
+
+def _max_entries():
+    return getattr(settings, 'TAG_CACHE_MAX_ENTRIES', 10000)
+
+
+def _count(**counts):
+    counts = {name: n for name, n in counts.items() if n}
+    if not counts:
+        return
+    updates = {name: F(name) + n for name, n in counts.items()}
+    if not TagCacheStats.objects.filter(pk=1).update(**updates):
+        TagCacheStats.objects.bulk_create([TagCacheStats(pk=1)], ignore_conflicts=True)
+        TagCacheStats.objects.filter(pk=1).update(**updates)
+
+
+def stats():
+    """Hit/miss/eviction counters of every process plus table totals."""
+    counters = TagCacheStats.objects.filter(pk=1).first() or TagCacheStats()
+    lookups = counters.hits + counters.misses
+    return {
+        'hits': counters.hits,
+        'misses': counters.misses,
+        'hit_rate': round(counters.hits / lookups, 4) if lookups else None,
+        'evictions': counters.evictions,
+        'since': counters.since.isoformat(),
+        'entries': TagCacheEntry.objects.count(),
+        'stored_hits': TagCacheEntry.objects.aggregate(total=Sum('hits'))['total'] or 0,
+    }
+
+
+def reset_stats():
+    TagCacheStats.objects.filter(pk=1).delete()
+
+
+def cache_key(title, overview, fingerprint=None):
+    text = ' '.join(f"{title or ''} {overview or ''}".lower().split())
+    fingerprint = fingerprint or ai.config_fingerprint()
+    return hashlib.sha256(f"{fingerprint}\n{text}".encode()).hexdigest()
+
+
+def extract_tags_batch(docs, batch_size=ai.DEFAULT_BATCH_SIZE):
+    """Cached drop-in for `ai.extract_tags_batch`."""
+    docs = list(docs)
+    if not _max_entries():
+        return ai.extract_tags_batch(docs, batch_size=batch_size)
+
+    fingerprint = ai.config_fingerprint()
+    keys = [cache_key(title, overview, fingerprint) for title, overview in docs]
+    cached = dict(TagCacheEntry.objects.filter(key__in=set(keys)).values_list('key', 'tags'))
+    if cached:
+        TagCacheEntry.objects.filter(key__in=cached).update(
+            hits=F('hits') + 1, last_used=timezone.now()
+        )
+
+    # Tag each distinct missing document once, even if it repeats in `docs`.
+    missing = {}
+    for key, doc in zip(keys, docs):
+        if key not in cached:
+            missing.setdefault(key, doc)
+    _count(hits=len(keys) - sum(1 for key in keys if key in missing), misses=len(missing))
+
+    if missing:
+        fresh = ai.extract_tags_batch(list(missing.values()), batch_size=batch_size)
+        new_entries = dict(zip(missing, fresh))
+        _store(new_entries, fingerprint)
+        cached.update(new_entries)
+    return [list(cached[key]) for key in keys]
+
+
+def _store(entries, fingerprint):
+    # Another worker may have cached the same content concurrently.
+    TagCacheEntry.objects.bulk_create(
+        [TagCacheEntry(key=key, fingerprint=fingerprint, tags=tags) for key, tags in entries.items()],
+        ignore_conflicts=True,
+    )
+    _evict(fingerprint, len(entries))
+
+
+def _evict(fingerprint, added):
+    limit = _max_entries()
+    evicted = 0
+    with _table_lock:
+        if _table['fingerprint'] != fingerprint:
+            evicted, _ = TagCacheEntry.objects.exclude(fingerprint=fingerprint).delete()
+            _table.update(fingerprint=fingerprint, estimate=None)
+        estimate = _table['estimate']
+        if estimate is not None:
+            estimate += added
+        if estimate is None or estimate > limit or time.monotonic() - _table['counted_at'] > RECOUNT_AFTER:
+            estimate = TagCacheEntry.objects.count()
+            overflow = estimate - (limit - limit // 10) if estimate > limit else 0
+            if overflow > 0:
+                stale = list(TagCacheEntry.objects.order_by('last_used', 'c_id').values_list('pk', flat=True)[:overflow])
+                deleted, _ = TagCacheEntry.objects.filter(pk__in=stale).delete()
+                evicted += deleted
+                estimate -= deleted
+            _table['counted_at'] = time.monotonic()
+        _table['estimate'] = estimate
+    _count(evictions=evicted)
+
+
+def clear():
+    TagCacheEntry.objects.all().delete()
+    with _table_lock:
+        _table.update(fingerprint=None, estimate=None)
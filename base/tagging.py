@@ -0,0 +1,291 @@
+"""Background tagging queue.
+
+Saving a bookmark only persists the Article and records a TaggingJob; the
+KeyBERT pass and the Preference writes happen later, off the request path.
+Jobs live in the database, so no external broker is needed. How they get
+drained is controlled by the TAGGING_QUEUE_MODE setting:
+
+* 'thread' - a daemon thread inside the web process drains the queue right
+  after the saving transaction commits (default, nothing else to run). It
+  also wakes up for retries that come due and requeues stale jobs, at least
+  every POLL_INTERVAL.
+* 'worker' - jobs wait for `manage.py run_tagging_worker`.
+* 'sync'   - the job is processed inline before the response (old behaviour).
+"""
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from tagger import ai
+from tagger.ai import DEFAULT_BATCH_SIZE
+from . import feed, interests, recommend, tag_cache, term_stats
+from .models import Article, Preference, TaggingJob
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = timedelta(seconds=30)
+STALE_AFTER = timedelta(minutes=10)
+POLL_INTERVAL = timedelta(minutes=1)
+
+
+def _mode():
+    return getattr(settings, 'TAGGING_QUEUE_MODE', 'thread')
+
+
+def enqueue_tagging(article, user):
+    """Queue `article` for tagging on behalf of `user` and mark it pending."""
+    job, created = TaggingJob.objects.get_or_create(article=article, user=user)
+    if not created:
+        _requeue(TaggingJob.objects.filter(pk=job.pk))
+    Article.objects.filter(pk=article.pk).update(tags_pending=True)
+
+    mode = _mode()
+    if mode == 'sync':
+        process_job(job.pk)
+    elif mode == 'thread':
+        transaction.on_commit(_wake_local_worker)
+    return job
+
+
+def enqueue_tagging_many(article_ids, user, batch_size=DEFAULT_BATCH_SIZE):
+    """Bulk `enqueue_tagging` for imports: one insert for the new jobs, one
+    update to requeue existing ones. Returns the job ids."""
+    article_ids = list(article_ids)
+    now = timezone.now()
+    TaggingJob.objects.bulk_create(
+        [TaggingJob(article_id=pk, user=user, available_at=now) for pk in article_ids],
+        ignore_conflicts=True,
+    )
+    jobs = TaggingJob.objects.filter(article_id__in=article_ids, user=user)
+    _requeue(jobs)
+    Article.objects.filter(pk__in=article_ids).update(tags_pending=True)
+    job_ids = list(jobs.values_list('pk', flat=True))
+
+    mode = _mode()
+    if mode == 'sync':
+        for start in range(0, len(job_ids), batch_size):
+            process_jobs(job_ids[start:start + batch_size])
+    elif mode == 'thread':
+        transaction.on_commit(_wake_local_worker)
+    return job_ids
+
+
+def _requeue(jobs):
+    # Re-saving an article: finished jobs run again, in one update. Running
+    # ones keep their state and are only flagged for _finish, so that no
+    # second worker can claim them meanwhile.
+    now = timezone.now()
+    running = Q(status=TaggingJob.RUNNING)
+    jobs.exclude(status=TaggingJob.PENDING).update(
+        status=Case(When(running, then=Value(TaggingJob.RUNNING)), default=Value(TaggingJob.PENDING)),
+        attempts=Case(When(running, then=F('attempts')), default=Value(0)),
+        available_at=Case(When(running, then=F('available_at')), default=Value(now)),
+        updated=Case(When(running, then=F('updated')), default=Value(now)),
+        rerun=Case(When(running, then=Value(True)), default=Value(False)),
+    )
+
+
+def apply_tags(article, user, tags):
+    # One insert for new tags, one lookup, one insert into the through-table,
+    # then the saver's weighted interests are bumped (no per-user M2M growth).
+    preferences = Preference.objects.get_or_create_many(tags)
+    article.preferences.add(*preferences)
+    interests.add_interests(user, [preference.pk for preference in preferences])
+
+
+# Highest Preference id already offered to the tag vocabulary by this process.
+_vocabulary_synced_to = 0
+_vocabulary_lock = threading.Lock()
+
+
+def sync_vocabulary():
+    """With the 'vocabulary' tagger backend, embed the tag titles created
+    since the last call (all of them the first time; terms already in the
+    vocabulary file are skipped). Returns how many terms were embedded."""
+    global _vocabulary_synced_to
+    if ai.get_backend().name != 'vocabulary':
+        return 0
+    with _vocabulary_lock:
+        rows = list(
+            Preference.objects.filter(p_id__gt=_vocabulary_synced_to, title__isnull=False)
+            .order_by('p_id').values_list('p_id', 'title')
+        )
+        if not rows:
+            return 0
+        added = ai.extend_vocabulary(title for _, title in rows)
+        _vocabulary_synced_to = rows[-1][0]
+        return added
+
+
+def _claim(job_id):
+    # Only one worker can move a job from pending to running.
+    return TaggingJob.objects.filter(
+        pk=job_id, status=TaggingJob.PENDING
+    ).update(status=TaggingJob.RUNNING, updated=timezone.now()) == 1
+
+
+def _finish(job, error=None):
+    if error is None:
+        job.status = TaggingJob.DONE
+        job.last_error = ''
+    else:
+        job.attempts += 1
+        job.last_error = error
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = TaggingJob.FAILED
+        else:
+            job.status = TaggingJob.PENDING
+            job.available_at = timezone.now() + RETRY_DELAY * job.attempts
+    job.updated = timezone.now()
+    fields = {name: getattr(job, name) for name in ['status', 'attempts', 'last_error', 'available_at', 'updated']}
+    if not TaggingJob.objects.filter(pk=job.pk, rerun=False).update(**fields):
+        # Re-saved while this run was going: start over with the new content.
+        job.status, job.attempts, job.last_error, job.available_at = TaggingJob.PENDING, 0, '', job.updated
+        TaggingJob.objects.filter(pk=job.pk).update(
+            status=job.status, attempts=0, last_error='', available_at=job.updated, updated=job.updated, rerun=False
+        )
+
+    if not TaggingJob.objects.filter(
+        article_id=job.article_id, status__in=[TaggingJob.PENDING, TaggingJob.RUNNING]
+    ).exists():
+        Article.objects.filter(pk=job.article_id).update(tags_pending=False)
+
+
+def process_jobs(job_ids):
+    """Tag the given queued jobs with one batched model call.
+
+    Returns how many jobs this call claimed and processed.
+    """
+    claimed = [job_id for job_id in job_ids if _claim(job_id)]
+    if not claimed:
+        return 0
+    jobs = list(TaggingJob.objects.select_related('article', 'user').filter(pk__in=claimed))
+    try:
+        sync_vocabulary()
+        all_tags = tag_cache.extract_tags_batch(
+            [(job.article.title, job.article.overview) for job in jobs]
+        )
+    except Exception as exc:
+        for job in jobs:
+            _finish(job, error=repr(exc))
+        return len(jobs)
+
+    if recommend.enabled():
+        try:
+            recommend.embed_articles({job.article_id: job.article for job in jobs if not job.article.embedding}.values())
+        except Exception as exc:
+            for job in jobs:
+                _finish(job, error=repr(exc))
+            return len(jobs)
+
+    # Articles tagged for the first time join the tfidf document frequencies.
+    already_tagged = set(
+        Article.preferences.through.objects.filter(article_id__in=[job.article_id for job in jobs])
+        .values_list('article_id', flat=True).distinct()
+    )
+    first_tagged = {}
+    for job, tags in zip(jobs, all_tags):
+        try:
+            with transaction.atomic():
+                apply_tags(job.article, job.user, tags)
+                feed.add_article_to_feeds(job.article)
+                if recommend.enabled():
+                    recommend.update_user_profile(job.user)
+        except Exception as exc:
+            _finish(job, error=repr(exc))
+        else:
+            _finish(job)
+            if job.article_id not in already_tagged:
+                first_tagged[job.article_id] = f"{job.article.title or ''} {job.article.overview or ''}"
+    term_stats.add_documents(first_tagged.values())
+    # The savers' interests changed: rebuild their feeds once, on their next visit.
+    feed.mark_stale({job.user_id for job in jobs})
+    return len(jobs)
+
+
+def process_job(job_id):
+    """Tag a single queued job. Returns True if this call processed it."""
+    return process_jobs([job_id]) == 1
+
+
+def requeue_stale():
+    """Put jobs left running by a crashed worker back in the queue."""
+    return TaggingJob.objects.filter(
+        status=TaggingJob.RUNNING, updated__lt=timezone.now() - STALE_AFTER
+    ).update(status=TaggingJob.PENDING, rerun=False)
+
+
+def pending_job_ids(limit):
+    return list(
+        TaggingJob.objects.filter(status=TaggingJob.PENDING, available_at__lte=timezone.now())
+        .values_list('pk', flat=True)[:limit]
+    )
+
+
+def run_pending(limit=50):
+    """Drain up to `limit` ready jobs. Returns how many were processed."""
+    return process_jobs(pending_job_ids(limit))
+
+
+# In-process stand-in for a worker, used in 'thread' mode.
+_local_worker = None
+_local_worker_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def _drain_local_queue():
+    """One pass of the local worker. Returns how many seconds it may sleep."""
+    requeue_stale()
+    while run_pending():
+        pass
+    next_at = (
+        TaggingJob.objects.filter(status=TaggingJob.PENDING)
+        .order_by('available_at').values_list('available_at', flat=True).first()
+    )
+    wait = POLL_INTERVAL.total_seconds()
+    if next_at is not None:
+        wait = min(wait, (next_at - timezone.now()).total_seconds())
+    # Not below a second, so a job another worker holds cannot make this spin.
+    return max(wait, 1.0)
+
+
+def _local_worker_loop():
+    while True:
+        close_old_connections()
+        try:
+            wait = _drain_local_queue()
+        except Exception:
+            # Keep the thread alive; try again on the next poll.
+            wait = POLL_INTERVAL.total_seconds()
+        finally:
+            connection.close()
+        _wakeup.wait(wait)
+        _wakeup.clear()
+
+
+def _wake_local_worker():
+    global _local_worker
+    with _local_worker_lock:
+        if _local_worker is None or not _local_worker.is_alive():
+            _local_worker = threading.Thread(
+                target=_local_worker_loop, name='tagging-worker', daemon=True
+            )
+            _local_worker.start()
+    _wakeup.set()
+
+
+def warm_on_startup():
+    """Load the tagger backend in the background when a server process starts
+    (BookmarkHub/wsgi.py and asgi.py), so the first save does not wait for it.
+
+    Skipped without TAGGER_WARM_ON_STARTUP, and in 'worker' mode, where web
+    processes never tag. Returns the warming thread, if one was started.
+    """
+    if not getattr(settings, 'TAGGER_WARM_ON_STARTUP', True) or _mode() == 'worker':
+        return None
+    thread = threading.Thread(target=ai.warm, name='tagger-warmup', daemon=True)
+    thread.start()
+    return thread
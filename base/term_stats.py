@@ -0,0 +1,72 @@
+"""Corpus document frequencies for the 'tfidf' tagger backend.
+
+DocumentFrequency holds, for every content word (`ai.content_words`), how
+many tagged articles contain it; the row for the empty term counts the
+articles themselves. Articles are counted the first time they are tagged
+(base/tagging.py), with one update per distinct increment so concurrent
+workers never lose counts. `rebuild()` recounts every article.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+
+from tagger import ai
+from .models import Article, DocumentFrequency
+
+CORPUS = ''  # term of the row counting all documents
+CHUNK_SIZE = 500
+BATCH_SIZE = 500  # terms per IN (...) clause
+
+
+def document_frequencies(words):
+    """({word: documents containing it}, total documents), as the tfidf
+    backend expects from TAGGER_DOCUMENT_FREQUENCIES."""
+    terms = [CORPUS, *words]
+    rows = {}
+    for start in range(0, len(terms), BATCH_SIZE):
+        rows.update(
+            DocumentFrequency.objects.filter(term__in=terms[start:start + BATCH_SIZE])
+            .values_list('term', 'documents')
+        )
+    return rows, rows.pop(CORPUS, 0)
+
+
+def add_documents(texts):
+    """Count `texts` (one string per article) into the document frequencies."""
+    counts = Counter()
+    for text in texts:
+        counts.update({word[:100] for word in ai.content_words(text)})
+        counts[CORPUS] += 1
+    if not counts:
+        return
+    by_increment = defaultdict(list)
+    for term, n in counts.items():
+        by_increment[n].append(term)
+    with transaction.atomic():
+        DocumentFrequency.objects.bulk_create(
+            [DocumentFrequency(term=term) for term in counts], ignore_conflicts=True
+        )
+        for n, terms in by_increment.items():
+            for start in range(0, len(terms), BATCH_SIZE):
+                DocumentFrequency.objects.filter(term__in=terms[start:start + BATCH_SIZE]).update(
+                    documents=F('documents') + n
+                )
+
+
+def rebuild(chunk_size=CHUNK_SIZE):
+    """Recount the document frequencies of every article. Returns the count."""
+    total = 0
+    with transaction.atomic():
+        DocumentFrequency.objects.all().delete()
+        texts = []
+        articles = Article.objects.values_list('title', 'overview').order_by('a_id')
+        for title, overview in articles.iterator(chunk_size=chunk_size):
+            texts.append(f"{title or ''} {overview or ''}")
+            if len(texts) == chunk_size:
+                add_documents(texts)
+                total += len(texts)
+                texts = []
+        add_documents(texts)
+        total += len(texts)
+    return total
@@ -1,3 +1,1052 @@
-from django.test import TestCase
+import json
+import os
+import re
+import tempfile
+import time
+import zlib
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from tagger import ai
+from .models import User, Preference, PreferenceToken, Article, Board, TaggingJob, TagCacheEntry
+from . import exporter, feed, fragments, importer, interests, profiling, recommend, search, tag_cache, tagging, term_stats
+from .pagination import encode_cursor
+
+
+class TaggerModelLoadingTests(TestCase):
+    def test_model_not_loaded_on_import(self):
+        from base import views  # noqa: F401
+        self.assertFalse(ai.is_model_loaded())
+
+    def test_server_startup_warms_in_the_background(self):
+        with mock.patch('tagger.ai.warm') as warm:
+            tagging.warm_on_startup().join()
+            warm.assert_called_once_with()
+            with override_settings(TAGGING_QUEUE_MODE='worker'):
+                self.assertIsNone(tagging.warm_on_startup())
+            with override_settings(TAGGER_WARM_ON_STARTUP=False):
+                self.assertIsNone(tagging.warm_on_startup())
+        self.assertEqual(warm.call_count, 1)
+
+
+@override_settings(TAGGING_QUEUE_MODE='worker')
+class TaggingQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='reader@example.com', password='pw', name='reader')
+        self.board = Board.objects.create(name='Reading', user=self.user)
+        self.client.force_login(self.user)
+
+    def save_article(self):
+        self.client.post(f'/board-add-confirmation/{self.board.name}/', {
+            'title': 'Rust for web development',
+            'overview': 'Building fast web servers',
+            'link': 'https://example.com/rust',
+            'pic': '',
+        })
+        return Article.objects.get()
+
+    def test_save_queues_job_without_tagging(self):
+        with mock.patch('tagger.ai.extract_tags_batch') as extract:
+            article = self.save_article()
+        extract.assert_not_called()
+        self.assertTrue(article.tags_pending)
+        self.assertEqual(TaggingJob.objects.get().status, TaggingJob.PENDING)
+
+    def test_worker_attaches_tags(self):
+        article = self.save_article()
+        with mock.patch('tagger.ai.extract_tags_batch', return_value=[['rust', 'web development']]):
+            self.assertEqual(tagging.run_pending(), 1)
+            self.assertEqual(tagging.run_pending(), 0)
+        article.refresh_from_db()
+        self.assertFalse(article.tags_pending)
+        self.assertEqual(set(article.preferences.values_list('title', flat=True)), {'rust', 'web development'})
+        self.user.refresh_from_db()
+        self.assertEqual(len(self.user.interests), 2)
+        # Rebuilt on the next visit, not once per job
+        self.assertIsNone(self.user.feed_refreshed)
+
+    def test_failed_job_is_retried_later(self):
+        self.save_article()
+        with mock.patch('tagger.ai.extract_tags_batch', side_effect=RuntimeError('boom')):
+            tagging.run_pending()
+        job = TaggingJob.objects.get()
+        self.assertEqual(job.status, TaggingJob.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(tagging.pending_job_ids(10), [])
+
+    def test_resave_during_a_run_queues_one_more_run(self):
+        article = self.save_article()
+
+        def resave_while_running(docs, **kwargs):
+            tagging.enqueue_tagging(article, self.user)
+            # Still running: no other worker may claim it.
+            self.assertEqual(TaggingJob.objects.get().status, TaggingJob.RUNNING)
+            self.assertEqual(tagging.run_pending(), 0)
+            return [['rust']]
+
+        with mock.patch('tagger.ai.extract_tags_batch', side_effect=resave_while_running):
+            self.assertEqual(tagging.run_pending(), 1)
+        job = TaggingJob.objects.get()
+        self.assertEqual((job.status, job.rerun), (TaggingJob.PENDING, False))
+        article.refresh_from_db()
+        self.assertTrue(article.tags_pending)
+
+        with mock.patch('tagger.ai.extract_tags_batch', return_value=[['rust']]):
+            self.assertEqual(tagging.run_pending(), 1)
+        self.assertEqual(TaggingJob.objects.get().status, TaggingJob.DONE)
+
+    def test_local_worker_picks_up_retries_and_stale_jobs(self):
+        self.save_article()
+        with mock.patch('tagger.ai.extract_tags_batch', side_effect=RuntimeError('boom')):
+            wait = tagging._drain_local_queue()
+        # Sleeps until the retry is due rather than until the next save.
+        self.assertAlmostEqual(wait, tagging.RETRY_DELAY.total_seconds(), delta=5)
+
+        later = timezone.now() + tagging.RETRY_DELAY
+        with mock.patch('django.utils.timezone.now', return_value=later), \
+                mock.patch('tagger.ai.extract_tags_batch', return_value=[['rust']]):
+            self.assertEqual(tagging._drain_local_queue(), tagging.POLL_INTERVAL.total_seconds())
+        self.assertEqual(TaggingJob.objects.get().status, TaggingJob.DONE)
+
+        crashed_at = timezone.now() - 2 * tagging.STALE_AFTER
+        TaggingJob.objects.update(status=TaggingJob.RUNNING, updated=crashed_at, available_at=crashed_at)
+        with mock.patch('tagger.ai.extract_tags_batch', return_value=[['rust']]):
+            tagging._drain_local_queue()
+        self.assertEqual(TaggingJob.objects.get().status, TaggingJob.DONE)
+
+
+class FakeKeyBERT:
+    def extract_keywords(self, docs, **kwargs):
+        keywords = [[(doc.split()[0].lower(), 0.9), ('noise', 0.1)] for doc in docs]
+        return keywords[0] if len(docs) == 1 else keywords
+
+
+class BatchTaggingTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch('tagger.ai.get_model', return_value=FakeKeyBERT())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batch_matches_single_calls(self):
+        docs = [('Climate report', 'renewable energy in Europe'), ('Python tips', 'web development'), ('Solo', '')]
+        batched = ai.extract_tags_batch(docs, batch_size=2)
+        single = [ai.extract_tags(title, overview) for title, overview in docs]
+        self.assertEqual([sorted(tags) for tags in batched], [sorted(tags) for tags in single])
+
+
+class FakeEmbedder:
+    # Hashed bag of words: texts sharing words get similar unit vectors.
+    class model:
+        @staticmethod
+        def embed(texts):
+            vectors = np.zeros((len(texts), 512), dtype=np.float32)
+            for row, text in enumerate(texts):
+                for token in ai._tokenize(text):
+                    vectors[row, zlib.crc32(token.encode()) % 512] += 1
+            return vectors
+
+
+@override_settings(TAGGER_BACKEND='vocabulary')
+class VocabularyTaggingTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(TAGGER_VOCABULARY_PATH=os.path.join(directory.name, 'vocabulary.npz'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for patcher in [
+            mock.patch('tagger.ai.get_model', return_value=FakeEmbedder()),
+            mock.patch.dict(ai._vocabularies, clear=True),
+            mock.patch('base.tagging._vocabulary_synced_to', 0),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_tags_are_nearest_vocabulary_terms(self):
+        tags = ai.extract_tags_batch([('Quantum widgets', 'widgets for renewable energy storage')])[0]
+        self.assertIn('renewable energy', tags)
+        self.assertIn('vocabulary', ai.config_fingerprint())
+
+    def test_vocabulary_is_cached_on_disk_and_extended_incrementally(self):
+        ai.get_vocabulary()
+        ai._vocabularies.clear()
+        with mock.patch('tagger.ai._embed_documents', wraps=ai._embed_documents) as embed:
+            vocabulary = ai.get_vocabulary()
+            self.assertEqual(embed.call_count, 0)
+            self.assertEqual(len(vocabulary), len(ai.SMART_KEYWORDS))
+
+            Preference.objects.get_or_create_many(['rustlang', 'AI'])
+            self.assertEqual(tagging.sync_vocabulary(), 1)
+            Preference.objects.get_or_create_many(['zig'])
+            self.assertEqual(tagging.sync_vocabulary(), 1)
+        self.assertEqual([call.args[0] for call in embed.call_args_list], [['rustlang'], ['zig']])
+        self.assertEqual(vocabulary.top_k(ai._embed_documents(['rustlang compiler']), 1, 0.1)[0][0][0], 'rustlang')
+
+
+@override_settings(TAGGER_BACKEND='tfidf', TAGGING_QUEUE_MODE='worker')
+class TfidfBackendTests(TestCase):
+    def test_ranks_by_corpus_rarity_without_a_model(self):
+        term_stats.add_documents(['common rust', 'common python', 'common golang'])
+        with mock.patch('tagger.ai.get_model', side_effect=AssertionError('no model')):
+            keywords = ai.get_backend().keywords(['common rust rust python'])[0]
+            tags = ai.extract_tags_batch([('Common rust', 'rust and python')])[0]
+        self.assertEqual([word for word, _ in keywords], ['rust', 'python'])
+        self.assertIn('rust', tags)
+        self.assertTrue(ai.config_fingerprint().startswith('tfidf'))
+
+    def test_articles_count_once_when_first_tagged(self):
+        user = User.objects.create_user(email='reader@example.com', password='pw', name='reader')
+        other = User.objects.create_user(email='other@example.com', password='pw', name='other')
+        article = Article.objects.create(title='Rust tips', overview='', link='https://example.com/rust')
+        for saver in [user, other]:
+            tagging.enqueue_tagging(article, saver)
+            tagging.run_pending()
+        self.assertEqual(term_stats.document_frequencies(['rust', 'tips']), ({'rust': 1, 'tips': 1}, 1))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            ai.get_backend('gpt')
+
+
+class SmartKeywordMatcherTests(TestCase):
+    def test_matches_whole_words_only(self):
+        tags = ai.match_smart_keywords("Officials said the start of the season went well")
+        self.assertNotIn('art', tags)
+        self.assertNotIn('AI', tags)
+
+    def test_matches_nested_phrases_once(self):
+        tags = ai.match_smart_keywords("Climate change and mental health. Climate again, AI too.")
+        self.assertEqual(sorted(tags), sorted(['climate', 'climate change', 'mental health', 'health', 'AI']))
+
+
+class TagCacheTests(TestCase):
+    def setUp(self):
+        tag_cache.clear()
+
+    def test_duplicate_content_skips_model(self):
+        with mock.patch('tagger.ai.extract_tags_batch', return_value=[['rust']]) as extract:
+            first = tag_cache.extract_tags_batch([('Rust  tips', 'Fast code')])
+            second = tag_cache.extract_tags_batch([('rust tips', 'fast   code')])
+        self.assertEqual(first, second)
+        self.assertEqual(extract.call_count, 1)
+        self.assertEqual(TagCacheEntry.objects.get().hits, 1)
+
+    def test_config_change_invalidates(self):
+        with mock.patch('tagger.ai.extract_tags_batch', return_value=[['rust']]) as extract:
+            tag_cache.extract_tags_batch([('Rust tips', '')])
+            with mock.patch('tagger.ai.KEYBERT_MIN_SCORE', 0.6):
+                tag_cache.extract_tags_batch([('Rust tips', '')])
+        self.assertEqual(extract.call_count, 2)
+        self.assertEqual(TagCacheEntry.objects.count(), 1)
+
+    @override_settings(TAG_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entries_are_evicted(self):
+        with mock.patch('tagger.ai.extract_tags_batch', side_effect=lambda docs, **kw: [['t']] * len(docs)):
+            for title in ['one', 'two', 'three']:
+                tag_cache.extract_tags_batch([(title, '')])
+        self.assertEqual(TagCacheEntry.objects.count(), 2)
+        self.assertFalse(TagCacheEntry.objects.filter(key=tag_cache.cache_key('one', '')).exists())
+
+    def test_counters_are_persisted_and_reported(self):
+        with mock.patch('tagger.ai.extract_tags_batch', side_effect=lambda docs, **kw: [['t']] * len(docs)):
+            tag_cache.extract_tags_batch([('one', ''), ('two', '')])
+            with CaptureQueriesContext(connection) as ctx:
+                tag_cache.extract_tags_batch([('one', ''), ('three', '')])
+        # Under the limit, a store neither counts nor sweeps the table.
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if 'COUNT(' in q['sql'] or 'DELETE' in q['sql']])
+        stats = tag_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 3, 0.25))
+
+        out = StringIO()
+        call_command('tag_cache_stats', stdout=out)
+        self.assertIn('Hit rate:  25.0%', out.getvalue())
+        call_command('tag_cache_stats', json=True, reset=True, stdout=StringIO())
+        self.assertEqual(tag_cache.stats()['misses'], 0)
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='reader@example.com', password='pw', name='reader')
+        self.other = User.objects.create_user(email='writer@example.com', password='pw', name='writer')
+        self.other_board = Board.objects.create(name='Misc', user=self.other)
+        self.user.preferences.add(Preference.objects.create(title='Science'))
+        self.client.force_login(self.user)
+
+    def make_article(self, title, *tags):
+        article = Article.objects.create(title=title, overview='', link=f'https://example.com/{title}')
+        article.boards.add(self.other_board)
+        article.preferences.add(*Preference.objects.get_or_create_many(tags))
+        return article
+
+    def feed_titles(self):
+        response = self.client.get('/home/')
+        return [a['title'] for a in response.context['article_data']]
+
+    def test_feed_ranks_by_matching_tags(self):
+        self.make_article('one match', 'science')
+        self.make_article('two matches', 'science', 'data science')
+        self.make_article('no match', 'cooking')
+        self.assertEqual(self.feed_titles(), ['two matches', 'one match'])
+
+    def test_keywords_match_whole_tokens(self):
+        self.make_article('token match', 'science fiction')
+        self.make_article('substring only', 'neuroscience')
+        self.assertEqual(self.feed_titles(), ['token match'])
+        self.assertEqual(feed._tag_score(['neuroscience', 'Science fiction'], {'science': 2.0}), 2.0)
+
+    def test_preference_tokens_follow_titles(self):
+        tag = Preference.objects.create(title='Machine Learning')
+        self.assertEqual(set(tag.tokens.values_list('token', flat=True)), {'machine', 'learning'})
+        tag.title = 'Deep learning'
+        tag.save()
+        self.assertEqual(set(tag.tokens.values_list('token', flat=True)), {'deep', 'learning'})
+
+        PreferenceToken.objects.all().delete()
+        call_command('index_preference_tokens', stdout=StringIO())
+        self.assertEqual(
+            set(PreferenceToken.objects.values_list('token', flat=True)), {'science', 'deep', 'learning'}
+        )
+
+    def test_new_articles_are_pushed_into_existing_feeds(self):
+        self.make_article('old', 'science')
+        self.assertEqual(self.feed_titles(), ['old'])
+        new = self.make_article('new', 'science', 'political science')
+        feed.add_article_to_feeds(new)
+        self.assertEqual(self.feed_titles(), ['new', 'old'])
+
+    @override_settings(FEED_MAX_ENTRIES=2)
+    def test_push_queries_do_not_grow_with_users(self):
+        self.feed_titles()  # builds the reader's interest profile and feed
+        self.make_article('old 1', 'science')
+        self.make_article('old 2', 'science')
+        feed.refresh_user_feed(self.user)
+
+        def push(title):
+            article = self.make_article(title, 'science')
+            with CaptureQueriesContext(connection) as ctx:
+                feed.add_article_to_feeds(article)
+            return len(ctx.captured_queries), set(article.feed_entries.values_list('user_id', flat=True))
+
+        few, recipients = push('first push')
+        self.assertEqual(recipients, {self.user.pk})
+        fans = [User.objects.create_user(email=f'fan{i}@example.com', password='pw', name=f'fan{i}') for i in range(5)]
+        for fan in fans:
+            interests.add_interests(fan, [Preference.objects.get(canonical_key='science').pk])
+        User.objects.create_user(email='idle@example.com', password='pw', name='idle')
+        many, recipients = push('second push')
+        self.assertEqual(many, few)
+        self.assertEqual(recipients, {self.user.pk, *(fan.pk for fan in fans)})
+        # Trimmed back to FEED_MAX_ENTRIES, keeping the newest
+        self.assertEqual(self.feed_titles(), ['second push', 'first push'])
+
+    def test_feed_without_interests_is_read_live(self):
+        self.user.preferences.clear()
+        self.assertEqual(self.feed_titles(), [])
+        self.make_article('fresh', 'cooking')
+        self.assertEqual(self.feed_titles(), ['fresh'])
+
+    def test_saved_articles_leave_the_feed(self):
+        article = self.make_article('saved', 'science')
+        self.assertEqual(self.feed_titles(), ['saved'])
+        Board.objects.create(name='Mine', user=self.user)
+        self.client.post('/board-add-confirmation/Mine/', {
+            'title': article.title, 'overview': '', 'link': article.link, 'pic': '',
+        })
+        self.assertEqual(self.feed_titles(), [])
+
+    def test_home_query_count_does_not_grow_with_articles(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.get('/home/')
+            return len(ctx.captured_queries)
+
+        self.make_article('first', 'science')
+        self.make_article('second', 'science')
+        feed.refresh_user_feed(self.user)
+        few = count_queries()
+        for i in range(10):
+            self.make_article(f'more {i}', 'science')
+        feed.refresh_user_feed(self.user)
+        self.assertEqual(count_queries(), few)
+        self.assertEqual(len(self.feed_titles()), 12)
+
+    @override_settings(FEED_PAGE_SIZE=2)
+    def test_cursor_pages_cover_feed_once(self):
+        for i in range(5):
+            self.make_article(f'article {i}', 'science')
+        response = self.client.get('/home/')
+        titles = [a['title'] for a in response.context['article_data']]
+        next_url = response.context['next_url']
+        while next_url:
+            data = self.client.get(next_url).json()
+            titles += re.findall(r'title="([^"]+)"', data['html'])
+            next_url = data['next']
+        self.assertEqual(sorted(titles), [f'article {i}' for i in range(5)])
+
+    @override_settings(FEED_PAGE_SIZE=2)
+    def test_article_list_cards_endpoint(self):
+        for i in range(3):
+            self.make_article(f'board article {i}', 'cooking')
+        response = self.client.get(f'/article-list/{self.other_board.pk}/')
+        self.assertEqual(len(response.context['article_data']), 2)
+        data = self.client.get(response.context['next_url']).json()
+        self.assertEqual(data['count'], 1)
+        self.assertIsNone(data['next'])
+        bad = self.client.get(f'/article-list/{self.other_board.pk}/cards/?cursor=garbage').json()
+        self.assertEqual(bad['count'], 2)
+
+    @override_settings(FEED_PAGE_SIZE=2)
+    def test_wrongly_typed_cursor_starts_from_first_page(self):
+        for i in range(3):
+            self.make_article(f'typed {i}', 'science')
+        feed.refresh_user_feed(self.user)
+        for url, values in [
+            ('/home/cards/', [{}, 1, 2]),
+            (f'/article-list/{self.other_board.pk}/cards/', [{}, 2]),
+            (f'/article-list/{self.other_board.pk}/cards/', [5, 2]),
+        ]:
+            response = self.client.get(url, {'cursor': encode_cursor(values)})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['count'], 2)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='reader@example.com', password='pw', name='reader')
+        self.client.force_login(self.user)
+
+    def search_titles(self, q):
+        response = self.client.get('/home/', {'q': q})
+        return [a['title'] for a in response.context['article_data']]
+
+    def test_prefix_match_ranks_title_hits_first(self):
+        Article.objects.create(title='Weekly roundup', overview='notes on machine learning')
+        Article.objects.create(title='Machine learning basics', overview='an introduction')
+        Article.objects.create(title='Cooking', overview='pasta')
+        self.assertEqual(self.search_titles('mach learn'), ['Machine learning basics', 'Weekly roundup'])
+
+    def test_index_follows_tag_changes(self):
+        article = Article.objects.create(title='Untitled', overview='')
+        self.assertEqual(self.search_titles('astronomy'), [])
+        article.preferences.add(Preference.objects.create(title='astronomy'))
+        self.assertEqual(self.search_titles('astronomy'), ['Untitled'])
+        article.delete()
+        self.assertEqual(search.search_article_ids('untitled'), [])
+
+    def test_index_follows_tag_renames(self):
+        tag = Preference.objects.create(title='astronomy')
+        Article.objects.create(title='Untitled', overview='').preferences.add(tag)
+        tag.title = 'stargazing'
+        tag.save()
+        self.assertEqual(self.search_titles('astronomy'), [])
+        self.assertEqual(self.search_titles('stargazing'), ['Untitled'])
+
+
+class SharedArticleTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(email='alice@example.com', password='pw', name='alice')
+        self.bob = User.objects.create_user(email='bob@example.com', password='pw', name='bob')
+        Board.objects.create(name='Reading', user=self.alice)
+        Board.objects.create(name='Later', user=self.bob)
+
+    def save_as(self, user, board, link):
+        self.client.force_login(user)
+        self.client.post(f'/board-add-confirmation/{board}/', {
+            'title': 'Same page', 'overview': 'text', 'link': link, 'pic': '',
+        })
+
+    def test_saving_same_link_reuses_article(self):
+        self.save_as(self.alice, 'Reading', 'https://www.example.com/post/?utm_source=x')
+        self.save_as(self.bob, 'Later', 'http://example.com/post')
+        article = Article.objects.get()
+        self.assertEqual(article.canonical_link, 'example.com/post')
+        self.assertEqual(article.boards.count(), 2)
+
+    def test_malformed_port_is_saved_unnormalized(self):
+        self.save_as(self.alice, 'Reading', ' HTTP://Example.com:abc/Post ')
+        self.assertEqual(Article.objects.get().canonical_link, 'http://example.com:abc/post')
+
+    def test_merge_command_collapses_existing_duplicates(self):
+        boards = list(Board.objects.all())
+        tags = [Preference.objects.create(title='one'), Preference.objects.create(title='two')]
+        # bulk_create skips save(), like rows written before canonical links existed
+        articles = Article.objects.bulk_create([Article(title='Dup', link='https://example.com/dup/') for _ in boards])
+        for article, board, tag in zip(articles, boards, tags):
+            article.boards.add(board)
+            article.preferences.add(tag)
+
+        call_command('merge_duplicate_articles', stdout=StringIO())
+        article = Article.objects.get()
+        self.assertEqual(article.canonical_link, 'example.com/dup')
+        self.assertEqual(article.boards.count(), 2)
+        self.assertEqual(article.preferences.count(), 2)
+
+
+class BulkPreferenceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='reader@example.com', password='pw', name='reader')
+        self.article = Article.objects.create(title='Tagged', link='https://example.com/tagged')
+
+    def test_get_or_create_many_reuses_existing(self):
+        existing = Preference.objects.create(title='science')
+        prefs = Preference.objects.get_or_create_many(['science', 'space', 'space', ''])
+        self.assertEqual(sorted(p.title for p in prefs), ['science', 'space'])
+        self.assertIn(existing, prefs)
+        self.assertEqual(Preference.objects.count(), 2)
+
+    def test_apply_tags_query_count_is_constant(self):
+        def count_queries(tags):
+            with CaptureQueriesContext(connection) as ctx:
+                tagging.apply_tags(self.article, self.user, tags)
+            return len(ctx.captured_queries)
+
+        few = count_queries(['alpha1', 'alpha2'])
+        many = count_queries([f'beta{i}' for i in range(20)])
+        self.assertEqual(few, many)
+        self.assertEqual(self.article.preferences.count(), 22)
+
+    def test_select_preferences_replaces_selection(self):
+        self.client.force_login(self.user)
+        self.client.post('/select-preferences', {'preferences': ['Technology', 'Science']})
+        self.client.post('/select-preferences', {'preferences': ['Science', 'Gaming']})
+        # Stored under their canonical titles, still shown as the options picked.
+        self.assertEqual(sorted(self.user.preferences.values_list('title', flat=True)), ['science', 'video games'])
+        response = self.client.get('/select-preferences')
+        self.assertEqual(sorted(response.context['user_selected']), ['Gaming', 'Science'])
+
+    def test_select_preferences_moves_interest_weight(self):
+        self.client.force_login(self.user)
+        self.client.post('/select-preferences', {'preferences': ['Technology', 'Gaming']})
+        for _ in range(3):
+            self.client.post('/select-preferences', {'preferences': ['Science']})
+        science = Preference.objects.get(canonical_key='science')
+        self.user.refresh_from_db()
+        self.assertEqual(list(self.user.interests), [str(science.pk)])
+        self.assertAlmostEqual(self.user.interests[str(science.pk)], interests.SELECTED_WEIGHT, places=3)
+        self.assertEqual(list(self.user.interest_tokens.values_list('token', flat=True)), ['science'])
+
+    def test_spellings_share_one_canonical_row(self):
+        keywords = [('AI', 0.9), ('games', 0.8)]
+        tags = ai._merge_tags('Artificial intelligence and gaming', keywords)
+        self.assertEqual(tags[:2], ['artificial intelligence', 'video games'])
+        self.assertFalse({'AI', 'games', 'gaming'} & set(tags))
+        first = Preference.objects.get_or_create_many(['Tech', 'AI'])
+        second = Preference.objects.get_or_create_many(['technology', 'ai'])
+        self.assertEqual({p.pk for p in first}, {p.pk for p in second})
+        self.assertEqual(sorted(p.title for p in first), ['artificial intelligence', 'technology'])
+
+    def test_merge_preferences_folds_near_duplicates(self):
+        # Rows from before canonical keys: bulk_create skips save(), so no key.
+        rows = Preference.objects.bulk_create(
+            [Preference(title=title) for title in ['AI', 'ai ', 'Games', 'gaming', 'space']]
+        )
+        ids = {row.title: row.pk for row in rows}
+        self.article.preferences.add(*rows)
+        self.user.preferences.add(ids['AI'], ids['ai '])
+        self.user.interests = {str(ids['AI']): 1.0, str(ids['ai ']): 0.5}
+        self.user.save(update_fields=['interests'])
+
+        out = StringIO()
+        call_command('merge_preferences', stdout=out)
+
+        self.assertEqual(
+            sorted(Preference.objects.values_list('title', 'canonical_key')),
+            [('artificial intelligence', 'artificial intelligence'), ('space', 'space'), ('video games', 'video game')],
+        )
+        self.assertEqual(self.article.preferences.count(), 3)
+        ai_pref = Preference.objects.get(title='artificial intelligence')
+        self.assertEqual(list(self.user.preferences.all()), [ai_pref])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.interests, {str(ai_pref.pk): 1.5})
+        self.assertIn('artificial', ai_pref.tokens.values_list('token', flat=True))
+        self.assertIn('preferences:       5 -> 3 rows', out.getvalue())
+
+    @skipUnless(connection.vendor == 'sqlite', 'rebuilds tables with SQLite DDL')
+    def test_merge_preferences_runs_on_the_original_schema(self):
+        # Take the tables back to the baseline schema: no token or search
+        # tables, no user interests, no canonical_key and no unique titles.
+        with connection.cursor() as cursor:
+            for table in ['base_preferencetoken', 'base_interesttoken', 'base_article_fts']:
+                cursor.execute(f'DROP TABLE IF EXISTS {table}')
+            cursor.execute('ALTER TABLE base_user DROP COLUMN interests')
+            cursor.execute('DROP TABLE base_preference')
+            cursor.execute(
+                'CREATE TABLE base_preference (p_id integer NOT NULL PRIMARY KEY AUTOINCREMENT, '
+                'title varchar(200) NULL, created datetime NOT NULL, updated datetime NOT NULL)'
+            )
+            cursor.executemany(
+                "INSERT INTO base_preference (p_id, title, created, updated) VALUES (%s, %s, '2024-01-01', '2024-01-01')",
+                [(1, 'Games'), (2, 'gaming'), (3, 'Games'), (4, 'space')],
+            )
+        self.article.preferences.through.objects.bulk_create(
+            [self.article.preferences.through(article_id=self.article.pk, preference_id=p_id) for p_id in [1, 2, 4]]
+        )
+        self.user.preferences.through.objects.bulk_create(
+            [self.user.preferences.through(user_id=self.user.pk, preference_id=p_id) for p_id in [2, 3]]
+        )
+
+        out = StringIO()
+        call_command('merge_preferences', stdout=out)
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT p_id, title FROM base_preference ORDER BY p_id')
+            self.assertEqual(cursor.fetchall(), [(1, 'video games'), (4, 'space')])
+        self.assertEqual(
+            sorted(self.article.preferences.through.objects.values_list('preference_id', flat=True)), [1, 4]
+        )
+        self.assertEqual(list(self.user.preferences.through.objects.values_list('preference_id', flat=True)), [1])
+        self.assertIn('preferences:       4 -> 2 rows', out.getvalue())
+        self.assertIn('run `migrate`, then this command again', out.getvalue())
+
+
+class VectorIndexTests(TestCase):
+    def test_ivf_search_matches_exact_search(self):
+        rng = np.random.default_rng(1)
+        centers = rng.normal(size=(20, 16))
+        vectors = np.vstack([c + 0.05 * rng.normal(size=(100, 16)) for c in centers]).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = list(range(1, len(vectors) + 1))
+
+        exact = recommend.VectorIndex(min_train_size=10**9)
+        exact.add(ids, vectors)
+        ivf = recommend.VectorIndex(min_train_size=500, nprobe=4)
+        ivf.add(ids[:1000], vectors[:1000])
+        self.assertIsNone(ivf.centroids)  # adding never trains inline
+        self.assertTrue(ivf.needs_training())
+        with mock.patch.object(recommend, '_index', ivf):
+            with recommend._index_lock:
+                recommend._start_training(ivf)
+                ivf.add(ids[1000:], vectors[1000:])  # added while the snapshot trains
+            recommend._trainer.join()
+        self.assertIsNotNone(ivf.centroids)
+        self.assertEqual(len(ivf.clusters), len(ids))
+
+        query = vectors[5]
+        self.assertEqual(ivf.search(query, 10), exact.search(query, 10))
+        self.assertNotIn(6, ivf.search(query, 10, exclude={6}))
+
+    def test_rows_rewritten_during_training_are_reassigned(self):
+        rng = np.random.default_rng(2)
+        vectors = rng.normal(size=(600, 8)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        index = recommend.VectorIndex(min_train_size=500, nprobe=1)
+        index.add(range(1, 601), vectors)
+        snapshot = index.vectors.copy()
+        fitted = index.fit(snapshot)
+        index.add([1], -vectors[:1])  # re-embedded while training ran
+        self.assertTrue(np.array_equal(snapshot[0], vectors[0]))
+        index.install(*fitted, snapshot=snapshot)
+        self.assertEqual(index.clusters[0], index._assign(-vectors[:1])[0])
+        self.assertEqual(index.search(-vectors[0], 1), [1])
+
+
+@override_settings(RECOMMENDER='embeddings', RECOMMEND_SYNC_SECONDS=0)
+class EmbeddingRecommendationTests(TestCase):
+    def setUp(self):
+        recommend.reset_index()
+        self.addCleanup(recommend.reset_index)
+        self.user = User.objects.create_user(email='reader@example.com', password='pw', name='reader')
+        self.board = Board.objects.create(name='Mine', user=self.user)
+        self.client.force_login(self.user)
+
+    def make_article(self, title, vector):
+        article = Article.objects.create(title=title, link=f'https://example.com/{title}')
+        article.embedding = recommend.to_blob(recommend._normalize(np.asarray(vector, dtype=np.float32)))
+        article.embedded = timezone.now()
+        article.save()
+        return article
+
+    def test_home_serves_nearest_articles(self):
+        saved = self.make_article('saved', [1, 0, 0])
+        saved.boards.add(self.board)
+        self.make_article('close', [0.9, 0.1, 0])
+        self.make_article('far', [0, 0, 1])
+        self.make_article('middle', [0.5, 0.5, 0])
+        recommend.update_user_profile(self.user)
+
+        response = self.client.get('/home/')
+        self.assertEqual([a['title'] for a in response.context['article_data']], ['close', 'middle', 'far'])
+
+    def test_deleted_articles_leave_the_index(self):
+        saved = self.make_article('saved', [1, 0, 0])
+        saved.boards.add(self.board)
+        close = self.make_article('close', [0.9, 0.1, 0])
+        self.make_article('far', [0, 0, 1])
+        recommend.update_user_profile(self.user)
+        self.user.refresh_from_db()
+        self.assertEqual(len(recommend.get_index()), 3)
+
+        close.delete()
+        self.assertEqual(len(recommend.get_index()), 2)
+        self.assertEqual(recommend.recommend(self.user, 1), [Article.objects.get(title='far').pk])
+
+    def test_sync_picks_up_embeddings_committed_late(self):
+        recommend.get_index()
+        # Embedded before that sync ran, but only committed after it.
+        late = self.make_article('late', [1, 0, 0])
+        Article.objects.filter(pk=late.pk).update(embedded=timezone.now() - timedelta(seconds=60))
+        self.assertIn(late.pk, recommend.get_index().rows)
+
+
+class InterestProfileTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='reader@example.com', password='pw', name='reader')
+        self.tags = [Preference.objects.create(title=f'tag{i}') for i in range(5)]
+
+    @override_settings(INTEREST_MAX_TERMS=3)
+    def test_profile_is_capped_to_strongest_terms(self):
+        interests.add_interests(self.user, [t.pk for t in self.tags[:4]])
+        interests.add_interests(self.user, [self.tags[4].pk], amount=5)
+        self.assertEqual(len(self.user.interests), 3)
+        self.assertEqual(interests.strongest(self.user, 1), [(self.tags[4].pk, 5.0)])
+
+    @override_settings(INTEREST_HALF_LIFE_DAYS=1)
+    def test_older_interests_decay(self):
+        interests.add_interests(self.user, [self.tags[0].pk])
+        later = timezone.now() + timedelta(days=2)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            interests.add_interests(self.user, [self.tags[1].pk])
+        weights = dict(interests.strongest(self.user))
+        self.assertAlmostEqual(weights[self.tags[0].pk], 0.25, places=3)
+        self.assertEqual(weights[self.tags[1].pk], 1.0)
+
+    def test_feed_ranks_by_interest_weight(self):
+        other = User.objects.create_user(email='writer@example.com', password='pw', name='writer')
+        board = Board.objects.create(name='Misc', user=other)
+        for title, tag in [('light', self.tags[0]), ('heavy', self.tags[1])]:
+            article = Article.objects.create(title=title, link=f'https://example.com/{title}')
+            article.boards.add(board)
+            article.preferences.add(tag)
+        interests.add_interests(self.user, [self.tags[0].pk])
+        interests.add_interests(self.user, [self.tags[1].pk], amount=3)
+        self.assertEqual([a.title for a in feed.candidate_articles(self.user)], ['heavy', 'light'])
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_seed_and_run_bench_report(self):
+        call_command('seed_bench', users=3, articles=40, saves_per_user=5, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 3)
+        out = StringIO()
+        call_command('run_bench', existing=True, iterations=2, stdout=out, stderr=StringIO())
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report['scenarios']), {
+            'home', 'home_search', 'home_cards', 'article_list', 'board_list', 'profile_page', 'save_article',
+        })
+        self.assertGreater(report['scenarios']['home']['queries'], 0)
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0)
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        profiling.metrics.reset()
+        self.user = User.objects.create_user(email='reader@example.com', password='pw', name='reader')
+        self.client.force_login(self.user)
+
+    def test_sampled_requests_get_server_timing(self):
+        response = self.client.get('/home/')
+        timing = response['Server-Timing']
+        for section in ('total', 'db', 'template', 'tagger', 'app'):
+            self.assertIn(f'{section};dur=', timing)
+        queries = int(re.search(r'"(\d+) queries"', timing).group(1))
+        self.assertGreater(queries, 0)
+        self.assertEqual(profiling.metrics.snapshot()['home']['count'], 1)
+
+    def test_tagger_time_is_attributed(self):
+        def slow_batch(docs):
+            time.sleep(0.02)
+            return [['tag']]
+
+        with override_settings(TAGGING_QUEUE_MODE='sync'), \
+                mock.patch('tagger.ai._extract_tags_batch', slow_batch):
+            board = Board.objects.create(name='Reading', user=self.user)
+            response = self.client.post(f'/board-add-confirmation/{board.name}/', {
+                'title': 'A page', 'overview': 'text', 'link': 'https://example.com/p', 'pic': '',
+            })
+        tagger_ms = float(re.search(r'tagger;dur=([\d.]+)', response['Server-Timing']).group(1))
+        self.assertGreaterEqual(tagger_ms, 20)
+        self.assertEqual(Article.objects.get().preferences.get().title, 'tag')
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.assertEqual(self.client.get('/metrics/profiling/').status_code, 302)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.get('/home/')
+        data = self.client.get('/metrics/profiling/').json()
+        self.assertIn('home', data['views'])
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled_middleware_adds_nothing(self):
+        self.assertNotIn('Server-Timing', self.client.get('/home/'))
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(email='owner@example.com', password='pw', name='owner')
+        self.viewer = User.objects.create_user(email='viewer@example.com', password='pw', name='viewer')
+        self.board = Board.objects.create(name='Reading', user=self.owner)
+        self.viewer_board = Board.objects.create(name='Mine', user=self.viewer)
+        self.articles = []
+        for i in range(2):
+            article = Article.objects.create(title=f'story {i}', overview='text', link=f'https://example.com/{i}')
+            article.boards.add(self.board)
+            self.articles.append(article)
+        self.articles[0].boards.add(self.viewer_board)
+
+    def test_cards_are_served_from_cache_with_viewer_save_buttons(self):
+        self.client.get(f'/article-list/{self.board.pk}/')
+        self.client.force_login(self.viewer)
+        with mock.patch('base.views.render_to_string') as render_cards:
+            response = self.client.get(f'/article-list/{self.board.pk}/')
+        render_cards.assert_not_called()
+        html = response.content.decode()
+        self.assertEqual(html.count('Save Article'), 1)
+        self.assertNotIn('<!--save:', html)
+        self.assertEqual([a['can_save'] for a in response.context['article_data']], [True, False])
+
+    def test_saving_to_board_invalidates_cards(self):
+        self.client.get(f'/article-list/{self.board.pk}/')
+        self.client.force_login(self.owner)
+        with override_settings(TAGGING_QUEUE_MODE='worker'):
+            self.client.post(f'/board-add-confirmation/{self.board.name}/', {
+                'title': 'fresh story', 'overview': 'text', 'link': 'https://example.com/new', 'pic': '',
+            })
+        self.assertContains(self.client.get(f'/article-list/{self.board.pk}/'), 'fresh story')
+
+    def test_board_creation_and_profile_edit_invalidate_board_list(self):
+        self.client.get('/board-list/owner/')
+        Board.objects.create(name='Recipes', user=self.owner)
+        self.assertContains(self.client.get('/board-list/owner/'), 'Recipes')
+        self.owner.name = 'renamed'
+        self.owner.save()
+        self.assertContains(self.client.get('/board-list/renamed/'), "renamed's Boards")
+
+    def test_invalid_cursors_share_the_first_page_entry(self):
+        with mock.patch('base.fragments.fragment', wraps=fragments.fragment) as fragment:
+            for cursor in ['', 'garbage', encode_cursor([{}, 2]), encode_cursor(['not a date', 2])]:
+                self.client.get(f'/article-list/{self.board.pk}/cards/', {'cursor': cursor})
+        parts = {call.args[2] for call in fragment.call_args_list}
+        self.assertEqual(parts, {'cards:30:first'})
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='reader@example.com', password='pw', name='reader')
+        self.board = Board.objects.create(name='Reading', user=self.user)
+
+    async def test_async_views_render(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/home/')
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.get(f'/article-list/{self.board.pk}/')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(TAGGING_QUEUE_MODE='worker', PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0)
+    async def test_async_save_is_profiled(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(f'/board-add-confirmation/{self.board.name}/', {
+            'title': 'A page', 'overview': 'text', 'link': 'https://example.com/p', 'pic': '',
+        })
+        self.assertContains(response, 'Article saved successfully!')
+        queries = int(re.search(r'"(\d+) queries"', response['Server-Timing']).group(1))
+        self.assertGreater(queries, 0)
+        self.assertEqual(await TaggingJob.objects.acount(), 1)
+
+
+class CachedSessionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email='reader@example.com', password='pw', name='reader')
+        response = self.client.post('/login/', {'email': 'Reader@example.com', 'password': 'pw'})
+        self.assertRedirects(response, '/home/', fetch_redirect_response=False)
+
+    def page_queries(self, client=None):
+        client = client or self.client
+        client.get('/button-details')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(client.get('/button-details').status_code, 200)
+        return [query['sql'] for query in ctx.captured_queries]
+
+    def test_authenticated_page_skips_session_and_user_queries(self):
+        cached = self.page_queries()
+        with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db', USER_CACHE_TIMEOUT=0):
+            # A new client, so its middleware is built with the plain db engine.
+            client = self.client_class()
+            client.cookies = self.client.cookies
+            uncached = self.page_queries(client)
+        self.assertEqual(len(uncached) - len(cached), 2)
+        self.assertFalse([sql for sql in cached if 'django_session' in sql or 'base_user' in sql])
+
+    def test_edit_profile_and_logout_forget_cached_user(self):
+        self.page_queries()
+        self.client.post('/edit-profile', {'name': 'renamed', 'description': ''})
+        self.assertEqual(self.client.get('/button-details').context['user'].name, 'renamed')
+        self.client.get('/logout/')
+        self.assertIsNone(cache.get(f'auth:user:{self.user.pk}'))
+        self.assertRedirects(self.client.get('/button-details'), '/login/?next=/button-details')
+
+
+@override_settings(TAGGING_QUEUE_MODE='worker')
+class LoadTestCommandTests(LiveServerTestCase):
+    def test_reports_each_concurrency_level(self):
+        user = User.objects.create_user(email='load@example.com', password='pw', name='load')
+        Board.objects.create(name='Reading', user=user)
+        out = StringIO()
+        call_command(
+            'load_test', url=self.live_server_url, email='load@example.com', password='pw',
+            save_board='Reading', concurrency=[1, 2], requests=4, stdout=out, stderr=StringIO(),
+        )
+        levels = json.loads(out.getvalue())['levels']
+        self.assertEqual([level['concurrency'] for level in levels], [1, 2])
+        self.assertEqual(sum(level['errors'] for level in levels), 0)
+        self.assertEqual(Article.objects.count(), 4)
+
+
+BOOKMARKS_HTML = b"""<!DOCTYPE NETSCAPE-Bookmark-file-1>
+<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">
+<TITLE>Bookmarks</TITLE>
+<H1>Bookmarks</H1>
+<DL><p>
+    <DT><H3>Reading</H3>
+    <DL><p>
+        <DT><A HREF="https://example.com/one" ADD_DATE="1700000000">First &amp; best</A>
+        <DD>A description
+        <DT><A HREF="https://www.example.com/one/?utm_source=x">Same page again</A>
+        <DT><A HREF="javascript:alert(1)">Bookmarklet</A>
+        <DT><A HREF="https://example.com/two">Second</A>
+    </DL><p>
+</DL><p>
+"""
+
+
+@override_settings(TAGGING_QUEUE_MODE='worker')
+class ImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='reader@example.com', password='pw', name='reader')
+        self.board = Board.objects.create(name='Imported', user=self.user)
+
+    def test_parse_browser_export(self):
+        rows = list(importer.parse_bookmarks(BytesIO(BOOKMARKS_HTML), 'bookmarks.html'))
+        self.assertEqual([row['link'] for row in rows], [
+            'https://example.com/one', 'https://www.example.com/one/?utm_source=x',
+            'javascript:alert(1)', 'https://example.com/two',
+        ])
+        self.assertEqual(rows[0]['title'], 'First & best')
+        self.assertEqual(rows[0]['overview'].strip(), 'A description')
+
+    def test_parse_csv_with_aliased_columns(self):
+        data = b'Title,URL,Note\nA page,https://example.com/a,hello\n'
+        self.assertEqual(list(importer.parse_bookmarks(BytesIO(data), 'export.csv')), [
+            {'link': 'https://example.com/a', 'title': 'A page', 'overview': 'hello'},
+        ])
+
+    def test_chunks_dedupe_and_reuse_existing_articles(self):
+        existing = Article.objects.create(title='Known', link='https://example.com/two')
+        rows = importer.parse_bookmarks(BytesIO(BOOKMARKS_HTML), 'bookmarks.html')
+        with CaptureQueriesContext(connection) as queries:
+            totals = list(importer.import_bookmarks(self.user, self.board, rows, chunk_size=2))
+        self.assertEqual(totals[-1], {'read': 4, 'created': 1, 'existing': 1, 'duplicates': 1, 'skipped': 1})
+        self.assertEqual(len(totals), 2)
+        self.assertEqual(set(self.board.articles.values_list('link', flat=True)), {
+            'https://example.com/one', existing.link,
+        })
+        self.assertEqual(TaggingJob.objects.filter(user=self.user).count(), 2)
+        self.assertTrue(Article.objects.get(link='https://example.com/one').tags_pending)
+        # A fixed number of queries per chunk, not per bookmark
+        self.assertLessEqual(len(queries), 12 * len(totals))
+
+    def test_command(self):
+        path = os.path.join(tempfile.mkdtemp(), 'bookmarks.html')
+        with open(path, 'wb') as f:
+            f.write(BOOKMARKS_HTML)
+        out = StringIO()
+        call_command('import_bookmarks', path, user='reader@example.com', board='New board', stdout=out)
+        self.assertIn('4 read: 2 new', out.getvalue())
+        self.assertEqual(Board.objects.get(name='New board').articles.count(), 2)
+
+    async def test_endpoint_streams_progress(self):
+        await self.async_client.aforce_login(self.user)
+        upload = SimpleUploadedFile('bookmarks.html', BOOKMARKS_HTML, content_type='text/html')
+        response = await self.async_client.post('/import-bookmarks', {'board_name': 'Imported', 'file': upload})
+        lines = [json.loads(line) for line in b''.join([chunk async for chunk in response.streaming_content]).splitlines()]
+        self.assertEqual(lines[0]['created'], 2)
+        self.assertEqual(lines[-1], {'done': True, 'url': f'/article-list/{self.board.pk}/'})
+        self.assertEqual(await self.board.articles.acount(), 2)
+
+    def test_wsgi_endpoint_streams_lazily_and_skips_bad_ports(self):
+        self.client.force_login(self.user)
+        data = b'url\nhttps://example.com/a\nhttp://example.com:abc/\nhttps://example.com/b\n'
+        upload = SimpleUploadedFile('export.csv', data, content_type='text/csv')
+        response = self.client.post('/import-bookmarks', {'board_name': 'Imported', 'file': upload})
+        # A plain iterator: WSGI sends each line as the import produces it.
+        self.assertFalse(response.is_async)
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(lines[0], {'read': 3, 'created': 2, 'existing': 0, 'duplicates': 0, 'skipped': 1})
+        self.assertTrue(lines[-1]['done'])
+
+    def test_unexpected_error_ends_stream_with_error_line(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile('bookmarks.html', BOOKMARKS_HTML, content_type='text/html')
+        with mock.patch('base.importer._import_chunk', side_effect=RuntimeError('boom')):
+            response = self.client.post('/import-bookmarks', {'board_name': 'Imported', 'file': upload})
+            with self.assertLogs('base.views', 'ERROR'):
+                lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(list(lines[-1]), ['error'])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='reader@example.com', password='pw', name='reader')
+        self.client.force_login(self.user)
+        for name in ('Reading', 'Cooking'):
+            board = Board.objects.create(name=name, user=self.user)
+            for i in range(3):
+                article = Article.objects.create(
+                    title=f'{name} <{i}>', overview='An "overview"', link=f'https://example.com/{name}/{i}'
+                )
+                article.boards.add(board)
+                article.preferences.add(Preference.objects.get_or_create(title=f'tag{i}')[0])
+
+    def export(self, export_format):
+        response = self.client.get(f'/export-bookmarks?format={export_format}')
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_jsonl(self):
+        rows = [json.loads(line) for line in self.export('jsonl').splitlines()]
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['board'], 'Reading')
+        self.assertEqual(rows[0]['tags'], ['tag0'])
+
+    def test_csv_and_html_round_trip_through_importer(self):
+        for export_format, filename in (('csv', 'export.csv'), ('html', 'export.html')):
+            rows = list(importer.parse_bookmarks(BytesIO(self.export(export_format)), filename))
+            self.assertEqual(len(rows), 6)
+            self.assertEqual(rows[0]['title'], 'Reading <0>')
+            self.assertEqual(rows[0]['overview'].strip(), 'An "overview"')
+
+    def test_tags_are_prefetched_per_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(exporter.export_jsonl(self.user, chunk_size=2))
+        self.assertEqual(len(rows), 6)
+        # boards + (articles + tags) per board, and one more tags query per extra chunk
+        self.assertLessEqual(len(queries), 1 + 2 * 2 + 2)
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get('/export-bookmarks?format=xml').status_code, 400)
+
+    async def test_asgi_streams_async_batches(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/export-bookmarks?format=jsonl')
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(body.splitlines()), 6)
@@ -0,0 +1,20 @@
+import re
+
+STOPWORDS = {"and", "the", "for", "of", "to", "in", "on", "with", "a", "an", "amp"}
+
+
+def tokenize(title):
+    """The match tokens of a tag title: lowercase words of three or more
+    characters, without stopwords. Feeds match interests to tags on these
+    (see PreferenceToken)."""
+    title = (title or "").lower()
+    return {w[:100] for w in re.findall(r"[a-z0-9]+", title) if len(w) >= 3 and w not in STOPWORDS}
+
+
+def weighted_keywords(weighted_titles):
+    """Keyword -> weight for the tokens of weighted tag titles."""
+    keywords = {}
+    for title, weight in weighted_titles.items():
+        for kw in tokenize(title):
+            keywords[kw] = max(keywords.get(kw, 0.0), weight)
+    return keywords
@@ -1,9 +1,10 @@
 from django.urls import path
-from . import views
+from . import profiling, views
 
 urlpatterns = [
     path('', views.firstPage, name='first-page'),
     path('home/', views.home, name='home'),
+    path('home/cards/', views.homeCards, name='home-cards'),
     path('login/', views.loginPage, name='login'),
     path('logout/', views.logoutUser, name='logout'),
     path('register/', views.registerPage, name='register'),
@@ -15,6 +16,10 @@ urlpatterns = [
     path('save-article/', views.saveArticle, name='save-article'),
     path('board-add-confirmation/<str:name>/', views.boardAddConfirmation, name='board-add-confirmation'),
     path('create-board', views.createBoard, name='create-board'),
+    path('import-bookmarks', views.importBookmarks, name='import-bookmarks'),
+    path('export-bookmarks', views.exportBookmarks, name='export-bookmarks'),
     path('board-list/<str:name>/', views.boardList, name='board-list'),
     path('article-list/<int:pk>/', views.articleList, name='article-list'),
+    path('article-list/<int:pk>/cards/', views.articleListCards, name='article-list-cards'),
+    path('metrics/profiling/', profiling.profilingMetrics, name='profiling-metrics'),
 ]
\ No newline at end of file
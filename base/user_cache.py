@@ -0,0 +1,55 @@
+"""Cached lookup of the logged-in user.
+
+With the cached_db session engine the session is read from the cache, but
+the authentication middleware still loads the User row on every request.
+CachedModelBackend keeps that row in the cache named by USER_CACHE_ALIAS for
+USER_CACHE_TIMEOUT seconds (0 disables it).
+
+Anything that changes a user has to call `forget()`: base/signals.py does so
+on saves (editProfile), deletes and logout, and the modules that write user
+fields with queryset updates (interests, feeds, profile embeddings) call it
+themselves. The short timeout bounds the staleness of anything missed.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def _cache():
+    return caches[getattr(settings, 'USER_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'USER_CACHE_TIMEOUT', 60)
+
+
+def _key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def forget(*user_ids):
+    """Drop the cached users, so their next request reloads them."""
+    if user_ids:
+        _cache().delete_many([_key(user_id) for user_id in user_ids])
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        if not _timeout():
+            return super().get_user(user_id)
+        user = _cache().get(_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                _cache().set(_key(user_id), user, _timeout())
+        return user
+
+    async def aget_user(self, user_id):
+        if not _timeout():
+            return await super().aget_user(user_id)
+        user = await _cache().aget(_key(user_id))
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                await _cache().aset(_key(user_id), user, _timeout())
+        return user
@@ -1,71 +1,98 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from .models import User, Preference, Article, Board
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from asgiref.sync import sync_to_async
+from .models import User, Preference, Article, Board, FeedEntry
 from django.contrib.auth import authenticate, login, logout
 from .forms import UserForm, UserCreationForm, MyUserCreationForm
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from tagger.ai import extract_tags  
-from django.db.models import Q
-import re
-
-STOPWORDS = {"and", "the", "for", "of", "to", "in", "on", "with", "a", "an", "amp"}
-
-def _keywords_from_prefs(user_preferences):
-    tokens = set()
-    for pref in user_preferences:
-        title = (pref.title or "").lower()
-        words = re.findall(r"[a-z0-9]+", title)
-        for w in words:
-            if len(w) >= 3 and w not in STOPWORDS:
-                tokens.add(w)
-    return tokens
-
-
-@login_required(login_url='login')
-def home(request):
-    user = request.user
-    user_preferences = user.preferences.all()
+from .tagging import enqueue_tagging
+from . import feed
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.urls import reverse
+from .links import normalize_link
+from tagger.normalize import canonical_key
+from .pagination import akeyset_page, decode_cursor, encode_cursor, keyset_page, list_page
+from . import exporter, fragments, interests, recommend, search
+from .importer import import_bookmarks, parse_bookmarks
+import json
+import logging
+from datetime import datetime
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# The feed, article-list and save views are async: queries go through the
+# async ORM, and template rendering, search, tagging and other sync work run
+# in a worker thread via sync_to_async, never on the event loop.
+_arender = sync_to_async(render)
+
+
+async def _auser(request):
+    # request.auser() and the request.user that templates read are cached
+    # separately; share the instance so the user is only loaded once.
+    request.user = user = await request.auser()
+    return user
+
+
+async def _apage(request, queryset, fields):
+    # A stale or tampered cursor just starts again from the first page
+    try:
+        return await akeyset_page(queryset, fields, request.GET.get("cursor"), settings.FEED_PAGE_SIZE)
+    except (TypeError, ValueError, ValidationError):
+        return await akeyset_page(queryset, fields, None, settings.FEED_PAGE_SIZE)
+
+
+async def _ranked_page(request, ranked_ids):
+    try:
+        page_ids, next_cursor = list_page(ranked_ids, request.GET.get("cursor"), settings.FEED_PAGE_SIZE)
+    except ValueError:
+        page_ids, next_cursor = list_page(ranked_ids, None, settings.FEED_PAGE_SIZE)
+    articles = await Article.objects.ain_bulk(page_ids)
+    return [articles[pk] for pk in page_ids if pk in articles], next_cursor
+
+
+async def _home_page(request, user):
     query = request.GET.get("q")
 
-    # Articles already saved
-    saved_titles = Article.objects.filter(boards__user=user).values_list("title", flat=True)
-
     if query:
-        articles = (
-            Article.objects.filter(
-                Q(preferences__title__icontains=query) |
-                Q(title__icontains=query) |
-                Q(overview__icontains=query)
-            )
-            .exclude(boards__user=user)
-            .exclude(title__in=saved_titles)
-            .distinct()
-        )
+        # Ranked ids from the full-text index (see base/search.py)
+        ranked_ids = await sync_to_async(search.search_article_ids)(query)
+
+        # Articles are unique per link, so only the user's own saves need hiding
+        saved_ids = {
+            pk async for pk in
+            Article.objects.filter(pk__in=ranked_ids, boards__user=user).values_list("pk", flat=True)
+        }
+        visible_ids = [pk for pk in ranked_ids if pk not in saved_ids]
+
+        unique_articles, next_cursor = await _ranked_page(request, visible_ids)
+    elif recommend.enabled() and user.profile_embedding:
+        # Nearest articles to the user's profile vector (see base/recommend.py)
+        ranked_ids = await sync_to_async(recommend.recommend)(user, settings.SEARCH_MAX_RESULTS)
+        unique_articles, next_cursor = await _ranked_page(request, ranked_ids)
     else:
-        # Build keywords from preferences
-        keywords = _keywords_from_prefs(user_preferences)
-
-        if keywords:
-            q_obj = Q()
-            for kw in keywords:
-                q_obj |= Q(preferences__title__icontains=kw)
-
-            articles = (
-                Article.objects.filter(q_obj)
-                .exclude(boards__user=user)
-                .exclude(title__in=saved_titles)
-                .distinct()
-            )
+        # Precomputed and ranked (see base/feed.py)
+        if user.feed_refreshed is None:
+            await sync_to_async(feed.refresh_user_feed)(user)
+        if user.interests:
+            entries = FeedEntry.objects.filter(user=user).select_related('article')
+            entries, next_cursor = await _apage(request, entries, ("score", "updated", "article_id"))
+            unique_articles = [entry.article for entry in entries]
         else:
-            articles = Article.objects.exclude(boards__user=user).exclude(title__in=saved_titles)
-
-    # Dedup by title
-    seen_titles = set()
-    unique_articles = []
-    for article in articles:
-        if article.title not in seen_titles:
-            seen_titles.add(article.title)
-            unique_articles.append(article)
+            # No interests yet: nothing is pushed to this feed, so read it live
+            articles = await sync_to_async(feed.candidate_articles)(user)
+            unique_articles, next_cursor = await _apage(request, articles, ("score", "updated", "a_id"))
+
+    # Save state for the whole page in one query instead of one per card
+    saved_ids = {
+        pk async for pk in
+        Article.objects.filter(boards__user=user, pk__in=[a.pk for a in unique_articles])
+        .values_list("pk", flat=True)
+    }
 
     article_data = [
         {
@@ -74,12 +101,44 @@ def home(request):
             "link": article.link,
             "overview": article.overview,
             "id": article.a_id,
-            "show_save": not article.boards.filter(user=user).exists(),
+            "can_save": article.pk not in saved_ids,
         }
         for article in unique_articles
     ]
+    return article_data, next_cursor
+
+
+def _next_url(request, view_name, next_cursor, *args):
+    if not next_cursor:
+        return None
+    params = request.GET.copy()
+    params["cursor"] = next_cursor
+    return f"{reverse(view_name, args=args)}?{params.urlencode()}"
 
-    return render(request, "base/home.html", {"article_data": article_data, "query": query})
+
+def _cards_response(request, article_data, next_url, html=None):
+    if html is None:
+        html = render_to_string("base/article_cards.html", {"article_data": article_data}, request=request)
+    return JsonResponse({"html": html, "count": len(article_data), "next": next_url})
+
+
+@login_required(login_url='login')
+async def home(request):
+    query = request.GET.get("q")
+    article_data, next_cursor = await _home_page(request, await _auser(request))
+    context = {
+        "article_data": article_data,
+        "query": query,
+        "next_url": _next_url(request, "home-cards", next_cursor),
+    }
+    return await _arender(request, "base/home.html", context)
+
+
+@login_required(login_url='login')
+async def homeCards(request):
+    article_data, next_cursor = await _home_page(request, await _auser(request))
+    next_url = _next_url(request, "home-cards", next_cursor)
+    return await sync_to_async(_cards_response)(request, article_data, next_url)
 
 
 def loginPage(request):
@@ -92,12 +151,7 @@ def loginPage(request):
         email = request.POST.get('email').lower()
         password = request.POST.get('password')
 
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            messages.error(request, 'User does not exist')
-            return render(request, 'base/login_register.html', {'page': page})
-
+        # authenticate() already looks the user up by email.
         user = authenticate(request, email=email, password=password)
 
         if user is not None:
@@ -173,18 +227,21 @@ def selectPreferences(request):
     if request.method == 'POST':
         selected_titles = request.POST.getlist('preferences')
 
-        # Clear existing preferences
-        request.user.preferences.clear()
+        # Replace existing preferences in one transaction with bulk writes
+        with transaction.atomic():
+            previous = list(request.user.preferences.values_list('pk', flat=True))
+            selected = Preference.objects.get_or_create_many(selected_titles)
+            request.user.preferences.set(selected)
+            interests.select_interests(request.user, previous, [pref.pk for pref in selected])
 
-        for title in selected_titles:
-            # Create or fetch Preference object for each title
-            pref, _ = Preference.objects.get_or_create(title=title)
-            request.user.preferences.add(pref)
+        feed.refresh_user_feed(request.user)
 
         return redirect('button-details')
 
-    # Fetch currently selected preferences by title
-    user_selected = request.user.preferences.values_list("title", flat=True)
+    # Options are stored under their canonical tag ("Gaming" -> "video games"),
+    # so match them back by canonical key
+    selected_keys = set(request.user.preferences.values_list("canonical_key", flat=True))
+    user_selected = [pref for pref in hardcoded_prefs if canonical_key(pref) in selected_keys]
 
     context = {
         'preferences': hardcoded_prefs,   # send hardcoded list
@@ -250,37 +307,42 @@ def saveArticle(request):
     return render(request, 'base/save_article.html', context)
 
 
+def _save_to_board(user, board, title, overview, link, pic_url):
+    # Articles are shared by link: saving a page someone already saved only
+    # adds it to this board.
+    canonical_link = normalize_link(link)
+    fields = {'title': title, 'overview': overview, 'link': link, 'pic': pic_url}
+    if canonical_link:
+        article, _ = Article.objects.get_or_create(canonical_link=canonical_link, defaults=fields)
+    else:
+        article = Article.objects.create(**fields)
+    article.boards.add(board)
+
+    feed.remove_saved(user, article)
+    enqueue_tagging(article, user)
+    return article
+
+
 @login_required(login_url='login')
-def boardAddConfirmation(request, name):
+async def boardAddConfirmation(request, name):
     if request.method == 'POST':
-        board_name = request.POST.get('board_name') or name
+        post = await sync_to_async(lambda: request.POST)()
+        board_name = post.get('board_name') or name
+        user = await _auser(request)
 
         try:
-            board = Board.objects.get(name=board_name, user=request.user)
+            board = await Board.objects.aget(name=board_name, user=user)
         except Board.DoesNotExist:
-            return render(request, 'base/board_add_confirmation.html', {'error': 'Board not found'})
-
-        title = request.POST.get('title')
-        overview = request.POST.get('overview')
-        link = request.POST.get('link')
-        pic_url = request.POST.get('pic')
+            return await _arender(request, 'base/board_add_confirmation.html', {'error': 'Board not found'})
 
-        article = Article.objects.create(
-            title=title,
-            overview=overview,
-            link=link,
-            pic = pic_url
-        )
-        article.boards.add(board)
+        title = post.get('title')
+        overview = post.get('overview')
+        link = post.get('link')
+        pic_url = post.get('pic')
 
-        tags = extract_tags(title, overview)
+        await sync_to_async(_save_to_board)(user, board, title, overview, link, pic_url)
 
-        for tag in tags:
-            preference, created = Preference.objects.get_or_create(title=tag)
-            article.preferences.add(preference)
-            request.user.preferences.add(preference)
-
-        return render(request, 'base/board_add_confirmation.html', {
+        return await _arender(request, 'base/board_add_confirmation.html', {
             'message': 'Article saved successfully!',
             'board': board
         })
@@ -288,76 +350,161 @@ def boardAddConfirmation(request, name):
     return redirect('save-article')
 
 @login_required(login_url='login')
-def createBoard(request):
+async def createBoard(request):
     if request.method == 'POST':
-        name = request.POST.get('name')
-        title = request.POST.get('title')
-        overview = request.POST.get('overview')
-        link = request.POST.get('link')
-        pic_url = request.POST.get("pic")
+        post = await sync_to_async(lambda: request.POST)()
+        name = post.get('name')
+        title = post.get('title')
+        overview = post.get('overview')
+        link = post.get('link')
+        pic_url = post.get("pic")
 
         if name:
-            board = Board.objects.create(name=name, user=request.user)
+            user = await _auser(request)
+            board = await Board.objects.acreate(name=name, user=user)
 
             if title and overview and link:
-                # Step 1: Create the article
-                article = Article.objects.create(
-                    title=title,
-                    overview=overview,
-                    link=link,
-                    pic=pic_url 
-                )
-                article.boards.add(board)
-
-                tags = extract_tags(title, overview)
-
-                for tag in tags:
-                    preference, created = Preference.objects.get_or_create(title=tag)
-                    article.preferences.add(preference)
-                    request.user.preferences.add(preference)
+                await sync_to_async(_save_to_board)(user, board, title, overview, link, pic_url)
 
             return redirect('save-article')
 
-    return render(request, 'base/create_board.html')
+    return await _arender(request, 'base/create_board.html')
+
+
+def _import_progress(user, board, upload):
+    # One JSON line per committed chunk, so the page can show progress.
+    try:
+        for totals in import_bookmarks(user, board, parse_bookmarks(upload.file, upload.name)):
+            yield json.dumps(totals) + "\n"
+    except ValueError as exc:
+        yield json.dumps({"error": str(exc)}) + "\n"
+        return
+    except Exception:
+        # Committed chunks stay; end the stream with an error, not a cut-off body.
+        logger.exception("Bookmark import into board %s failed", board.pk)
+        yield json.dumps({"error": "The import stopped on an unexpected error."}) + "\n"
+        return
+    yield json.dumps({"done": True, "url": reverse('article-list', args=[board.pk])}) + "\n"
+
+
+@login_required(login_url='login')
+async def importBookmarks(request):
+    user = await _auser(request)
+    boards = [board async for board in Board.objects.filter(user=user)]
+
+    if request.method == 'POST':
+        # Reading the multipart body spools the upload to disk: keep it off the event loop
+        post, files = await sync_to_async(lambda: (request.POST, request.FILES))()
+        board_name = (post.get('board_name') or '').strip()
+        upload = files.get('file')
+        if not board_name or upload is None:
+            return await _arender(request, 'base/import_bookmarks.html', {
+                'boards': boards, 'error': 'Choose a board and a file to import.'
+            })
+
+        board = next((board for board in boards if board.name == board_name), None)
+        if board is None:
+            board = await Board.objects.acreate(name=board_name, user=user)
+        # One line per batch, so each chunk's totals are sent as soon as it commits.
+        progress = exporter.for_response(request, _import_progress(user, board, upload), batch_size=1)
+        return StreamingHttpResponse(progress, content_type='application/x-ndjson')
+
+    return await _arender(request, 'base/import_bookmarks.html', {'boards': boards})
+
+
+@login_required(login_url='login')
+def exportBookmarks(request):
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in exporter.EXPORTERS:
+        return HttpResponseBadRequest('Unknown export format')
+    content_type, extension = exporter.FORMATS[export_format]
+    pieces = exporter.EXPORTERS[export_format](request.user)
+    response = StreamingHttpResponse(exporter.for_response(request, pieces), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="bookmarks.{extension}"'
+    return response
 
 def boardList(request, name):
     user = get_object_or_404(User, name=name)
-    boards = Board.objects.filter(user=user)
-    board_data = [{'name': board.name, 'pk': board.pk} for board in boards]
+
+    def build():
+        boards = Board.objects.filter(user=user)
+        board_data = [{'name': board.name, 'pk': board.pk} for board in boards]
+        return render_to_string('base/board_list_content.html', {'user': user, 'board_data': board_data})
+
     context = {
         'user': user,
-        'board_data': board_data
+        'boards_html': mark_safe(fragments.fragment('user', user.pk, 'boards', build)),
     }
     return render(request, 'base/board_list.html', context)
 
-def articleList(request, pk):
-    board = get_object_or_404(Board, pk=pk)
-    articles = Article.objects.filter(boards=board).distinct()
+def _board_cursor(cursor):
+    # Re-encoded (updated, a_id) cursor of a board page, or None (page 1) for a
+    # missing or invalid one, so junk cursors cannot mint new cache entries.
+    try:
+        updated, a_id = decode_cursor(cursor or "", 2)
+        if not isinstance(updated, str) or isinstance(a_id, bool) or not isinstance(a_id, int):
+            raise ValueError("Invalid cursor")
+        datetime.fromisoformat(updated)
+    except ValueError:
+        return None
+    return encode_cursor([updated, a_id])
+
+
+async def _article_list_page(request, board, user):
+    cursor = _board_cursor(request.GET.get("cursor"))
+
+    def build():
+        articles = Article.objects.filter(boards=board).distinct()
+        articles, next_cursor = keyset_page(articles, ("updated", "a_id"), cursor, settings.FEED_PAGE_SIZE)
+        article_data = [
+            {
+                'title': article.title,
+                'pic': article.pic if article.pic else '',
+                'overview': article.overview,
+                'link': article.link,
+                'id': article.pk,
+            }
+            for article in articles
+        ]
+        html = render_to_string("base/article_cards.html", {"article_data": article_data, "shared": True})
+        return {"article_data": article_data, "html": html, "next_cursor": next_cursor}
+
+    # Cards are shared by every viewer (see base/fragments.py) ...
+    part = f'cards:{settings.FEED_PAGE_SIZE}:{cursor or "first"}'
+    page = await sync_to_async(fragments.fragment)('board', board.pk, part, build)
+
+    # ... and only the save buttons depend on who is looking.
+    saveable_ids = set()
+    if user.is_authenticated:
+        page_ids = [article['id'] for article in page["article_data"]]
+        saved_ids = {
+            pk async for pk in
+            Article.objects.filter(boards__user=user, pk__in=page_ids).values_list("pk", flat=True)
+        }
+        saveable_ids = set(page_ids) - saved_ids
+
+    article_data = [dict(article, can_save=article['id'] in saveable_ids) for article in page["article_data"]]
+    html = mark_safe(fragments.overlay_save_buttons(page["html"], saveable_ids))
+    return article_data, html, page["next_cursor"]
 
-    # Preload all saved article titles for this user
-    saved_titles = set()
-    if request.user.is_authenticated:
-        saved_titles = set(
-            Article.objects.filter(boards__user=request.user)
-            .values_list("title", flat=True)
-        )
-
-    article_data = []
-    for article in articles:
-        can_save = request.user.is_authenticated and article.title not in saved_titles
-
-        article_data.append({
-            'title': article.title,
-            'pic': article.pic if article.pic else '',
-            'overview': article.overview,
-            'link': article.link,
-            'id': article.pk,
-            'can_save': can_save,
-        })
+
+async def articleList(request, pk):
+    board = await aget_object_or_404(Board, pk=pk)
+    user = await _auser(request)
+    article_data, cards_html, next_cursor = await _article_list_page(request, board, user)
 
     context = {
         'board': board,
         'article_data': article_data,
-        'user_name': request.user.name if request.user.is_authenticated else None,
+        'cards_html': cards_html,
+        'user_name': user.name if user.is_authenticated else None,
+        'next_url': _next_url(request, 'article-list-cards', next_cursor, board.pk),
     }
-    return render(request, 'base/article_list.html', context)
+    return await _arender(request, 'base/article_list.html', context)
+
+
+async def articleListCards(request, pk):
+    board = await aget_object_or_404(Board, pk=pk)
+    article_data, cards_html, next_cursor = await _article_list_page(request, board, await _auser(request))
+    next_url = _next_url(request, 'article-list-cards', next_cursor, board.pk)
+    return _cards_response(request, article_data, next_url, cards_html)
@@ -1,7 +1,100 @@
 # tagger/ai.py
-from keybert import KeyBERT
+import math
+import re
+import threading
+from collections import Counter
 
-kw_model = KeyBERT('all-mpnet-base-v2')  # Better quality model
+MODEL_NAME = 'all-mpnet-base-v2'  # Better quality model
+
+
+def _setting(name, default):
+    # tagger can be used outside Django (scripts, worker processes), so
+    # settings are optional and read lazily.
+    try:
+        from django.conf import settings
+        from django.core.exceptions import ImproperlyConfigured
+    except ImportError:
+        return default
+    try:
+        return getattr(settings, name, default)
+    except ImproperlyConfigured:
+        return default
+
+
+# Model registry: KeyBERT is only built on first use (or when warmed), never
+# at import time, and a single instance is shared by every thread.
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model(name=None):
+    name = name or _setting('TAGGER_MODEL_NAME', MODEL_NAME)
+    model = _models.get(name)
+    if model is None:
+        with _models_lock:
+            model = _models.get(name)
+            if model is None:
+                from keybert import KeyBERT
+                model = KeyBERT(name)
+                _models[name] = model
+    return model
+
+
+def is_model_loaded(name=None):
+    return (name or _setting('TAGGER_MODEL_NAME', MODEL_NAME)) in _models
+
+
+# Optional local worker pool. With TAGGER_POOL_SIZE > 0 the model lives only
+# in the pool processes and the web process never loads it.
+_pool = None
+_pool_lock = threading.Lock()
+
+
+_pool_worker = False
+
+
+def _pool_init():
+    global _pool_worker
+    _pool_worker = True
+    get_backend().warm()
+
+
+def get_pool():
+    global _pool
+    size = _setting('TAGGER_POOL_SIZE', 0)
+    if not size:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                _pool = ProcessPoolExecutor(
+                    max_workers=size,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_pool_init,
+                )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def warm():
+    """Load the tagger backend now, in the pool workers if a pool is configured."""
+    backend = get_backend()
+    pool = get_pool() if backend.uses_pool else None
+    if pool is None:
+        backend.warm()
+        return
+    size = _setting('TAGGER_POOL_SIZE', 0)
+    for future in [pool.submit(is_model_loaded) for _ in range(size)]:
+        future.result()
 
 # Smart keyword set (simplified from your JS version)
 SMART_KEYWORDS = set([
@@ -37,29 +130,234 @@ STOPWORDS = set([
         'as','it','from','at','be','are','was','or','which','but','we','can','has','have', 'why', 'not', 'all', 'if', 'so', 'do', 'you', 'your', 'they', 'their', 'he', 'she', 'him', 'her', 'my', 'me', 'us', 'our', 'what', 'who', 'when', 'where', 'how', 'does'
 ])
 
+def content_words(text):
+    words = re.findall(r'\b[a-z]{3,}\b', text.lower())
+    return [w for w in words if w not in STOPWORDS]
+
 def extract_top_words(text, n=5):
-    import re
-    from collections import Counter
+    return [word for word, _ in Counter(content_words(text)).most_common(n)]
 
-    words = re.findall(r'\b[a-z]{3,}\b', text.lower())
-    filtered = [w for w in words if w not in STOPWORDS]
-    return [word for word, _ in Counter(filtered).most_common(n)]
+# Words keep inner apostrophes and hyphens so "women's health" and
+# "e-learning" tokenize the same way in keywords and in text.
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
 
-def match_smart_keywords(text):
-    text_lower = text.lower()
-    return [kw for kw in SMART_KEYWORDS if kw in text_lower]
+def _tokenize(text):
+    return TOKEN_RE.findall(text.lower())
 
-def extract_tags(title, description=''):
-    combined_text = f"{title} {description}"
+def build_keyword_trie(keywords):
+    """Build a token trie: each node maps a word to its child node, and the
+    `None` key holds the keyword that ends there."""
+    trie = {}
+    for kw in keywords:
+        node = trie
+        for token in _tokenize(kw):
+            node = node.setdefault(token, {})
+        node[None] = kw
+    return trie
+
+SMART_KEYWORD_TRIE = build_keyword_trie(SMART_KEYWORDS)
+
+def match_smart_keywords(text, trie=SMART_KEYWORD_TRIE):
+    # One pass over the words of the text; every keyword (including ones
+    # nested in a longer phrase) is reported once, on whole words only.
+    tokens = _tokenize(text)
+    found = {}
+    for i, token in enumerate(tokens):
+        node = trie.get(token)
+        j = i + 1
+        while node is not None:
+            if None in node:
+                found.setdefault(node[None], None)
+            if j == len(tokens):
+                break
+            node = node.get(tokens[j])
+            j += 1
+    return list(found)
+
+KEYPHRASE_NGRAM_RANGE = (1, 2)
+KEYBERT_TOP_N = 10
+KEYBERT_MIN_SCORE = 0.45
+VOCABULARY_TOP_N = 10
+VOCABULARY_MIN_SCORE = 0.45
+TFIDF_TOP_N = 5
+TFIDF_MIN_SCORE = 0.3
+TFIDF_MAX_DF = 0.5
+DEFAULT_BATCH_SIZE = 32
+
+# ~22M parameters against mpnet's ~110M, for CPU-constrained nodes.
+SMALL_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+class TaggerBackend:
+    """Where the model-derived part of `extract_tags` comes from.
+
+    `keywords(texts)` returns one list of (keyword, score) pairs per text,
+    already cut at the backend's threshold; smart keywords and top words
+    are merged in by `extract_tags` whatever the backend.
+    """
+    name = None
+    uses_pool = True  # heavy enough to run in TAGGER_POOL_SIZE worker processes
+
+    def fingerprint(self):
+        return self.name
+
+    def warm(self):
+        pass
+
+    def keywords(self, texts):
+        raise NotImplementedError
+
+
+class KeyBERTBackend(TaggerBackend):
+    # KeyBERT embeds every candidate n-gram of each text with `model_name`.
+    def __init__(self, name, model_name):
+        self.name = name
+        self.model_name = model_name
 
-    # 1. KeyBERT extraction
-    keywords = kw_model.extract_keywords(
-        combined_text,
-        keyphrase_ngram_range=(1, 2),
+    def fingerprint(self):
+        return '|'.join([
+            self.model_name,
+            f'{KEYPHRASE_NGRAM_RANGE[0]}-{KEYPHRASE_NGRAM_RANGE[1]}',
+            str(KEYBERT_TOP_N),
+            str(KEYBERT_MIN_SCORE),
+        ])
+
+    def warm(self):
+        get_model(self.model_name)
+
+    def keywords(self, texts):
+        return [
+            [(kw, score) for kw, score in keywords if score >= KEYBERT_MIN_SCORE]
+            for keywords in _keybert_keywords(texts, self.model_name)
+        ]
+
+
+class VocabularyBackend(TaggerBackend):
+    # Nearest terms of the precomputed vocabulary (tagger/vocabulary.py).
+    name = 'vocabulary'
+
+    def fingerprint(self):
+        model_name = _setting('TAGGER_MODEL_NAME', MODEL_NAME)
+        return '|'.join([model_name, 'vocabulary', str(VOCABULARY_TOP_N), str(VOCABULARY_MIN_SCORE)])
+
+    def warm(self):
+        get_model()
+        get_vocabulary()
+
+    def keywords(self, texts):
+        vocabulary = get_vocabulary()
+        return vocabulary.top_k(_embed_documents(texts), VOCABULARY_TOP_N, VOCABULARY_MIN_SCORE)
+
+
+class TfidfBackend(TaggerBackend):
+    """Pure-Python TF-IDF over `content_words`, with no model at all.
+
+    Document frequencies come from the callable named by the
+    TAGGER_DOCUMENT_FREQUENCIES setting: given a list of words it returns
+    ({word: documents containing it}, total documents). Without one every
+    word is equally rare and this ranks by term frequency alone.
+    """
+    name = 'tfidf'
+    uses_pool = False
+
+    def fingerprint(self):
+        return '|'.join(['tfidf', str(TFIDF_TOP_N), str(TFIDF_MIN_SCORE), str(TFIDF_MAX_DF)])
+
+    def _document_frequencies(self, words):
+        path = _setting('TAGGER_DOCUMENT_FREQUENCIES', None)
+        if not path or not words:
+            return {}, 0
+        import importlib
+        module, name = path.rsplit('.', 1)
+        return getattr(importlib.import_module(module), name)(words)
+
+    def keywords(self, texts):
+        counts = [Counter(content_words(text)) for text in texts]
+        frequencies, total = self._document_frequencies(sorted(set().union(*counts)))
+        results = []
+        for words in counts:
+            length = sum(words.values())
+            scores = {}
+            for word, count in words.items():
+                documents = frequencies.get(word, 0)
+                if total and documents > TFIDF_MAX_DF * total:
+                    continue  # too common in this corpus to describe anything
+                scores[word] = count / length * (math.log((1 + total) / (1 + documents)) + 1)
+            best = max(scores.values(), default=0)
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:TFIDF_TOP_N]
+            results.append([(word, score / best) for word, score in ranked if score / best >= TFIDF_MIN_SCORE])
+        return results
+
+
+BACKENDS = {
+    'keybert': lambda: KeyBERTBackend('keybert', _setting('TAGGER_MODEL_NAME', MODEL_NAME)),
+    'small': lambda: KeyBERTBackend('small', _setting('TAGGER_SMALL_MODEL_NAME', SMALL_MODEL_NAME)),
+    'vocabulary': VocabularyBackend,
+    'tfidf': TfidfBackend,
+}
+
+def get_backend(name=None):
+    """The tagger backend named by `name` or the TAGGER_BACKEND setting."""
+    name = name or _setting('TAGGER_BACKEND', 'keybert')
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown TAGGER_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}") from None
+
+def config_fingerprint():
+    """Identifies the backend, model and thresholds that produced a set of
+    tags, so cached tags are dropped whenever any of them change."""
+    return get_backend().fingerprint()
+
+def _keybert_keywords(texts, model_name=None):
+    keywords = get_model(model_name).extract_keywords(
+        texts,
+        keyphrase_ngram_range=KEYPHRASE_NGRAM_RANGE,
         stop_words='english',
-        top_n=10
+        top_n=KEYBERT_TOP_N
     )
-    keybert_tags = [kw for kw, score in keywords if score >= 0.45]
+    # KeyBERT unwraps the result when it is given a single document.
+    if len(texts) == 1:
+        keywords = [keywords]
+    return keywords
+
+# Vocabulary backend: one Vocabulary per (file, model), loaded on first use.
+_vocabularies = {}
+_vocabularies_lock = threading.Lock()
+
+
+def _vocabulary_path():
+    import os
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vocabulary.npz')
+    return os.fspath(_setting('TAGGER_VOCABULARY_PATH', default))
+
+def _embed_for_vocabulary(texts):
+    # Pool workers embed locally; elsewhere the pool (if any) does it.
+    return _embed_documents(texts) if _pool_worker else embed_documents(texts)
+
+def get_vocabulary():
+    """The vocabulary matrix, built from SMART_KEYWORDS the first time."""
+    key = (_vocabulary_path(), _setting('TAGGER_MODEL_NAME', MODEL_NAME))
+    vocabulary = _vocabularies.get(key)
+    if vocabulary is None:
+        with _vocabularies_lock:
+            vocabulary = _vocabularies.get(key)
+            if vocabulary is None:
+                from .vocabulary import Vocabulary
+                vocabulary = Vocabulary(*key)
+                vocabulary.add(sorted(SMART_KEYWORDS), _embed_for_vocabulary)
+                _vocabularies[key] = vocabulary
+    vocabulary.refresh()
+    return vocabulary
+
+def extend_vocabulary(terms):
+    """Embed the `terms` (e.g. new tag titles) the vocabulary is missing.
+    Returns how many were added."""
+    return get_vocabulary().add(terms, _embed_for_vocabulary)
+
+def _merge_tags(combined_text, keywords):
+    # 1. Backend keywords (KeyBERT by default)
+    keybert_tags = [kw for kw, score in keywords]
 
     # 2. Smart matching
     smart_tags = match_smart_keywords(combined_text)
@@ -67,6 +365,56 @@ def extract_tags(title, description=''):
     # 3. Top words
     top_words = extract_top_words(combined_text)
 
-    # 4. Merge & dedupe
-    all_tags = list(set(keybert_tags + smart_tags + top_words))
-    return all_tags
\ No newline at end of file
+    # 4. Merge & dedupe by canonical form ('AI' / 'artificial intelligence')
+    from .normalize import canonical_tags
+    return canonical_tags(keybert_tags + smart_tags + top_words)
+
+def _extract_tags(title, description=''):
+    combined_text = f"{title} {description}"
+    return _merge_tags(combined_text, get_backend().keywords([combined_text])[0])
+
+def _extract_tags_batch(docs):
+    texts = [f"{title} {description}" for title, description in docs]
+    return [_merge_tags(text, keywords) for text, keywords in zip(texts, get_backend().keywords(texts))]
+
+def _pool_for_tagging():
+    return get_pool() if get_backend().uses_pool else None
+
+def extract_tags(title, description=''):
+    pool = _pool_for_tagging()
+    if pool is not None:
+        return pool.submit(_extract_tags, title, description).result()
+    return _extract_tags(title, description)
+
+def extract_tags_batch(docs, batch_size=DEFAULT_BATCH_SIZE):
+    """Tag many (title, description) pairs, embedding `batch_size` documents
+    per model call. Returns one tag list per document, in order."""
+    docs = [(title or '', description or '') for title, description in docs]
+    batches = [docs[i:i + batch_size] for i in range(0, len(docs), batch_size)]
+    pool = _pool_for_tagging()
+    if pool is not None:
+        results = pool.map(_extract_tags_batch, batches)
+    else:
+        results = map(_extract_tags_batch, batches)
+    return [tags for batch in results for tags in batch]
+
+
+def _embed_documents(texts):
+    import numpy as np
+
+    vectors = np.asarray(get_model().model.embed(texts), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def embed_documents(texts, batch_size=DEFAULT_BATCH_SIZE):
+    """Unit-length float32 sentence embeddings (one row per text) from the
+    same model KeyBERT tags with."""
+    import numpy as np
+
+    texts = list(texts)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if not batches:
+        return np.empty((0, 0), dtype=np.float32)
+    pool = get_pool()
+    results = pool.map(_embed_documents, batches) if pool is not None else map(_embed_documents, batches)
+    return np.vstack(list(results))
@@ -0,0 +1,55 @@
+"""Micro-benchmark for match_smart_keywords on long overviews.
+
+    python -m tagger.bench_matcher [--docs 2000] [--words 300]
+
+Compares the token-trie matcher with the old per-keyword substring scan.
+"""
+import argparse
+import random
+import time
+
+from tagger.ai import SMART_KEYWORDS, match_smart_keywords
+
+FILLER = (
+    "the report said a start up will share its latest results with investors "
+    "while researchers explore new ideas about markets people and the planet"
+).split()
+
+
+def substring_scan(text):
+    text_lower = text.lower()
+    return [kw for kw in SMART_KEYWORDS if kw in text_lower]
+
+
+def make_docs(count, words, seed=0):
+    rng = random.Random(seed)
+    keywords = sorted(SMART_KEYWORDS)
+    docs = []
+    for _ in range(count):
+        parts = [rng.choice(keywords) if rng.random() < 0.05 else rng.choice(FILLER) for _ in range(words)]
+        docs.append(' '.join(parts))
+    return docs
+
+
+def bench(fn, docs):
+    start = time.perf_counter()
+    for doc in docs:
+        fn(doc)
+    elapsed = time.perf_counter() - start
+    return len(docs) / elapsed, sum(len(doc) for doc in docs) / elapsed / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--docs', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=300, help="Words per overview.")
+    args = parser.parse_args()
+
+    docs = make_docs(args.docs, args.words)
+    for name, fn in [('substring scan', substring_scan), ('token trie', match_smart_keywords)]:
+        docs_per_sec, mb_per_sec = bench(fn, docs)
+        print(f"{name:15} {docs_per_sec:10.0f} docs/s {mb_per_sec:8.2f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Canonical tag titles.
+
+KeyBERT phrases, smart keywords and top words overlap: 'AI', 'ai' and
+'artificial intelligence', or 'games' and 'gaming', would otherwise each
+become a Preference row. Every title gets a canonical key:
+
+* case folded and tokenized like the smart keyword matcher,
+* each word stemmed (Porter's step 1: plurals, -ed, -ing, -y),
+* mapped through a synonym table built from SMART_KEYWORDS (acronyms of
+  multi-word keywords, plus the pairs in SYNONYMS).
+
+Titles with the same key are the same tag. Its display title is the
+SMART_KEYWORDS spelling when there is one, otherwise the first spelling seen.
+"""
+from .ai import SMART_KEYWORDS, _tokenize
+
+# canonical keyword: keywords (all in SMART_KEYWORDS) that mean the same thing
+SYNONYMS = {
+    'technology': ('tech',),
+    'programming': ('coding',),
+    'movies': ('cinema',),
+    'stock market': ('stocks',),
+    'video games': ('gaming',),
+    'investing': ('investment',),
+}
+
+
+def _consonant(word, i):
+    if word[i] in 'aeiou':
+        return False
+    if word[i] == 'y':
+        return i == 0 or not _consonant(word, i - 1)
+    return True
+
+
+def _measure(stem):
+    # Porter's m: the number of vowel-consonant sequences.
+    pattern = ''.join('c' if _consonant(stem, i) else 'v' for i in range(len(stem)))
+    return pattern.count('vc')
+
+
+def _has_vowel(stem):
+    return any(not _consonant(stem, i) for i in range(len(stem)))
+
+
+def _cvc(stem):
+    return (
+        len(stem) >= 3 and _consonant(stem, -3) and not _consonant(stem, -2)
+        and _consonant(stem, -1) and stem[-1] not in 'wxy'
+    )
+
+
+def stem(word):
+    """Porter stemmer step 1 (1a, 1b and 1c) for one lowercase word."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if word.endswith('sses') or word.endswith('ies'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+
+    if word.endswith('eed'):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ('ed', 'ing'):
+            if word.endswith(suffix) and _has_vowel(word[:-len(suffix)]):
+                word = word[:-len(suffix)]
+                if word.endswith(('at', 'bl', 'iz')):
+                    word += 'e'
+                elif len(word) > 1 and word[-1] == word[-2] and _consonant(word, -1) and word[-1] not in 'lsz':
+                    word = word[:-1]
+                elif _measure(word) == 1 and _cvc(word):
+                    word += 'e'
+                break
+
+    if word.endswith('y') and _has_vowel(word[:-1]):
+        word = word[:-1] + 'i'
+    return word
+
+
+def _stem_key(title):
+    return ' '.join(stem(token) for token in _tokenize(title or ''))
+
+
+def _synonym_pairs():
+    # (alias, canonical keyword); acronyms like 'AI' resolve to the long form.
+    pairs = [(alias, keyword) for keyword, aliases in SYNONYMS.items() for alias in aliases]
+    lowered = {keyword.lower(): keyword for keyword in SMART_KEYWORDS}
+    for keyword in sorted(SMART_KEYWORDS):
+        words = _tokenize(keyword)
+        acronym = ''.join(word[0] for word in words)
+        if len(words) > 1 and acronym in lowered:
+            pairs.append((lowered[acronym], keyword))
+    return pairs
+
+
+SYNONYM_KEYS = {_stem_key(alias): _stem_key(keyword) for alias, keyword in _synonym_pairs()}
+
+
+def canonical_key(title):
+    """The key all spellings of a tag share ('' for titles without words)."""
+    key = _stem_key(title)
+    return SYNONYM_KEYS.get(key, key)
+
+
+def _build_display_titles():
+    titles = {}
+    canonical = {keyword for _, keyword in _synonym_pairs()}
+    # Synonym targets first, then the shortest spelling.
+    for keyword in sorted(SMART_KEYWORDS, key=lambda kw: (kw not in canonical, len(kw), kw)):
+        titles.setdefault(canonical_key(keyword), keyword)
+    return titles
+
+
+SMART_TITLES = _build_display_titles()
+
+
+def display_title(title):
+    """How a tag is shown: its SMART_KEYWORDS spelling if it has one."""
+    return SMART_TITLES.get(canonical_key(title)) or ' '.join((title or '').split())
+
+
+def canonical_tags(tags):
+    """`tags` deduplicated by canonical key, as display titles, in order."""
+    seen = {}
+    for tag in tags:
+        key = canonical_key(tag)
+        if key and key not in seen:
+            seen[key] = display_title(tag)
+    return list(seen.values())
@@ -0,0 +1,111 @@
+"""Precomputed tag vocabulary embeddings for TAGGER_BACKEND = 'vocabulary'.
+
+KeyBERT embeds every candidate n-gram of every document it tags. Here the
+candidates are a fixed vocabulary (SMART_KEYWORDS plus the existing
+Preference titles) embedded once and kept as a unit-length float32 matrix in
+an .npz file, so tagging a document is one embedding and one matrix product.
+New terms are embedded and appended as they appear; the file is rewritten
+atomically and other processes reload it when its modification time changes.
+"""
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+DTYPE = np.float32
+
+
+class Vocabulary:
+    def __init__(self, path, model_name):
+        self.path = os.fspath(path)
+        self.model_name = model_name
+        self.terms = []
+        self.rows = {}
+        self.vectors = np.empty((0, 0), dtype=DTYPE)
+        self.lock = threading.Lock()
+        self._mtime = None
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, term):
+        return term in self.rows
+
+    def _stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self):
+        """Reload the matrix if another process has rewritten the file."""
+        with self.lock:
+            self._refresh()
+
+    def _refresh(self):
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return
+        with np.load(self.path, allow_pickle=False) as data:
+            # Vectors from another model are useless; start over.
+            if str(data['model']) != self.model_name:
+                return
+            terms = [str(term) for term in data['terms']]
+            vectors = data['vectors'].astype(DTYPE, copy=False)
+        # Vectors before terms: see top_k().
+        self.vectors = vectors
+        self.rows = {term: row for row, term in enumerate(terms)}
+        self.terms = terms
+        self._mtime = mtime
+
+    def save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, model=np.array(self.model_name), terms=np.array(self.terms, dtype=str),
+                         vectors=self.vectors)
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._mtime = self._stat()
+
+    def missing(self, terms):
+        return [term for term in dict.fromkeys(terms) if term and term not in self.rows]
+
+    def add(self, terms, embed):
+        """Embed the `terms` not in the vocabulary yet with `embed(texts)`
+        and save. Returns how many were added."""
+        with self.lock:
+            self._refresh()
+            new = self.missing(terms)
+            if not new:
+                return 0
+            vectors = np.asarray(embed(new), dtype=DTYPE)
+            self.vectors = vectors if not self.terms else np.vstack([self.vectors, vectors])
+            self.rows.update({term: len(self.terms) + i for i, term in enumerate(new)})
+            self.terms = self.terms + new
+            self.save()
+            return len(new)
+
+    def top_k(self, doc_vectors, k, min_score):
+        """The `k` terms nearest to each (unit-length) document vector, as
+        (term, cosine) pairs scoring at least `min_score`, best first."""
+        doc_vectors = np.asarray(doc_vectors, dtype=DTYPE)
+        # Lock-free: add() replaces vectors before terms, so this pair always lines up.
+        terms = self.terms
+        vectors = self.vectors[:len(terms)]
+        if not terms:
+            return [[] for _ in range(len(doc_vectors))]
+        scores = doc_vectors @ vectors.T
+        k = min(k, len(terms))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for doc_scores, rows in zip(scores, top):
+            rows = rows[np.argsort(-doc_scores[rows])]
+            results.append([
+                (terms[row], float(doc_scores[row])) for row in rows if doc_scores[row] >= min_score
+            ])
+        return results